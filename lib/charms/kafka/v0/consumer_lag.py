@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""ConsumerLagSampler and LagBuffer classes
+
+`ConsumerLagSampler` periodically collects the total lag of selected consumer groups,
+with one `kafka.consumer-groups --describe` invocation covering all of them per sample.
+Samples are kept per group in a `LagBuffer`, a fixed-size ring buffer backed by `array`,
+so memory use does not grow however long the sampler runs.
+
+From the buffered samples, the sampler estimates how fast each group's lag is growing,
+as the least-squares slope over the window, and how long the group would take to drain
+its lag at that rate. Results are handed to an optional callback after every sample,
+and can be scraped in the Prometheus text format.
+
+Example usage with `KafkaSnap`:
+
+```python
+
+sampler = ConsumerLagSampler(
+    snap=KafkaSnap(),
+    groups=["billing", "audit"],
+    bootstrap_server="localhost:9092",
+    command_config="/var/snap/kafka/common/client.properties",
+    interval=30.0,
+    callback=lambda stats: logger.info(stats),
+)
+sampler.start()
+sampler.serve(port=9309)
+...
+sampler.stop()
+```
+"""
+import logging
+import math
+import statistics
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from charms.kafka.v0.kafka_snap import KafkaSnap, _admin_client_args
+
+logger = logging.getLogger(__name__)
+
+# The unique Charmhub library identifier, never change it
+LIBID = "8301513382f14f59b9c0a8aae3f6c36f"
+
+# Increment this major API version when introducing breaking changes
+LIBAPI = 0
+
+# Increment this PATCH version before using `charmcraft publish-lib` or reset
+# to 0 if you are raising the major API version
+LIBPATCH = 2
+
+
+CONSUMER_GROUPS_HEADER = "GROUP"
+
+
+def _escape_label_value(value: str) -> str:
+    """Escapes a Prometheus label value, whose backslashes, quotes and newlines are special."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def parse_consumer_groups_describe(output: str) -> Dict[str, Dict[Tuple[str, int], int]]:
+    """Parses the output of `kafka.consumer-groups --describe`.
+
+    Args:
+        output: the raw command output
+
+    Returns:
+        Dict of group name to a dict of `(topic, partition)` to lag. Partitions without
+            a committed offset, reported with a `-` lag, are left out
+    """
+    groups: Dict[str, Dict[Tuple[str, int], int]] = {}
+    columns: Optional[List[str]] = None
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == CONSUMER_GROUPS_HEADER:
+            columns = fields
+            continue
+        if columns is None:
+            continue
+
+        row = dict(zip(columns, fields))
+        if not row.get("PARTITION", "").isdigit():
+            # e.g "Consumer group 'x' has no active members."
+            continue
+
+        group = groups.setdefault(row["GROUP"], {})
+        lag = row.get("LAG", "-")
+        if lag.isdigit():
+            group[(row["TOPIC"], int(row["PARTITION"]))] = int(lag)
+
+    return groups
+
+
+class LagBuffer:
+    """Fixed-size ring buffer of (timestamp, lag) samples."""
+
+    def __init__(self, capacity: int):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2 to estimate a rate")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._lags = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Returns the number of samples held."""
+        return self._count
+
+    def append(self, timestamp: float, lag: float) -> None:
+        """Adds a sample, overwriting the oldest one if the buffer is full."""
+        self._timestamps[self._next] = timestamp
+        self._lags[self._next] = lag
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def samples(self) -> Tuple[array, array]:
+        """Gets the held timestamps and lags, oldest first."""
+        start = (self._next - self._count) % self.capacity
+        if start + self._count <= self.capacity:
+            window = slice(start, start + self._count)
+            return self._timestamps[window], self._lags[window]
+
+        return (
+            self._timestamps[start:] + self._timestamps[: self._next],
+            self._lags[start:] + self._lags[: self._next],
+        )
+
+    @property
+    def latest(self) -> Optional[float]:
+        """The most recent lag, if any."""
+        if not self._count:
+            return None
+        return self._lags[(self._next - 1) % self.capacity]
+
+    def growth_rate(self) -> Optional[float]:
+        """Estimates how fast lag grows, in messages per second, over the whole window.
+
+        Returns:
+            The least-squares slope of lag over time, or None with fewer than two samples
+        """
+        timestamps, lags = self.samples()
+        if len(timestamps) < 2 or timestamps[0] == timestamps[-1]:
+            return None
+
+        # relative times keep the regression numerically stable with epoch timestamps
+        origin = timestamps[0]
+        slope, _ = statistics.linear_regression([t - origin for t in timestamps], lags)
+        return slope
+
+    def time_to_drain(self) -> Optional[float]:
+        """Estimates the seconds until lag reaches zero at the current rate.
+
+        Returns:
+            0 if there is no lag, `math.inf` if lag is not shrinking, or None with too few
+                samples to tell
+        """
+        latest, rate = self.latest, self.growth_rate()
+        if latest is None:
+            return None
+        if latest == 0:
+            return 0.0
+        if rate is None:
+            return None
+        if rate >= 0:
+            return math.inf
+
+        return latest / -rate
+
+
+class ConsumerLagSampler:
+    """Samples consumer group lag through `KafkaSnap` into per-group `LagBuffer`s."""
+
+    def __init__(
+        self,
+        snap: KafkaSnap,
+        groups: Iterable[str],
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+        capacity: int = 360,
+        interval: float = 10.0,
+        callback: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+    ):
+        self.snap = snap
+        self.groups = sorted(set(groups))
+        self.bootstrap_server = bootstrap_server
+        self.opts = opts or []
+        self.command_config = command_config
+        self.interval = interval
+        self.callback = callback
+        self.buffers = {group: LagBuffer(capacity) for group in self.groups}
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def sample(self) -> Dict[str, int]:
+        """Collects the current total lag of every group with a single tool invocation.
+
+        Groups missing from the output, e.g while they have no committed offsets, are
+        not sampled.
+
+        Returns:
+            Dict of group name to total lag across its partitions
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        bin_args = _admin_client_args(self.bootstrap_server, self.command_config)
+        bin_args += ["--describe", *(f"--group={group}" for group in self.groups)]
+
+        output = self.snap.run_bin_command(
+            "consumer-groups", bin_args, self.opts, lightweight_jvm=True
+        )
+        now = time.time()
+        totals = {
+            group: sum(lags.values())
+            for group, lags in parse_consumer_groups_describe(output).items()
+            if group in self.buffers
+        }
+
+        with self._lock:
+            for group, total in totals.items():
+                self.buffers[group].append(now, total)
+
+        if self.callback:
+            self.callback(self.stats())
+        return totals
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Gets the latest lag, growth rate and time to drain of every group.
+
+        Returns:
+            Dict of group name to a dict with `lag`, `growth_rate` in messages per second
+                and `time_to_drain` in seconds, each None if not known yet
+        """
+        with self._lock:
+            return {
+                group: {
+                    "lag": buffer.latest,
+                    "growth_rate": buffer.growth_rate(),
+                    "time_to_drain": buffer.time_to_drain(),
+                }
+                for group, buffer in self.buffers.items()
+            }
+
+    def prometheus(self) -> str:
+        """Renders the current stats in the Prometheus text exposition format."""
+        metrics = [
+            ("kafka_consumer_group_lag", "Total lag of the consumer group.", "lag"),
+            (
+                "kafka_consumer_group_lag_growth_rate",
+                "Lag growth rate of the consumer group, in messages per second.",
+                "growth_rate",
+            ),
+            (
+                "kafka_consumer_group_time_to_drain_seconds",
+                "Estimated seconds until the consumer group has no lag.",
+                "time_to_drain",
+            ),
+        ]
+        stats = self.stats()
+
+        lines = []
+        for name, description, key in metrics:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+            for group, group_stats in stats.items():
+                value = group_stats[key]
+                if value is None:
+                    continue
+                rendered = "+Inf" if value == math.inf else repr(float(value))
+                lines.append(f'{name}{{group="{_escape_label_value(group)}"}} {rendered}')
+
+        return "\n".join(lines) + "\n"
+
+    def _run(self) -> None:
+        """Samples every `interval` seconds until stopped."""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"consumer lag sample failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self) -> None:
+        """Starts sampling in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="consumer-lag", daemon=True)
+        self._thread.start()
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serves the Prometheus text format on `/metrics` from a background thread.
+
+        Args:
+            port: the port to listen on, 0 to pick a free one
+            host (optional): the address to listen on. Defaults to all addresses
+
+        Returns:
+            The running server, whose `server_address` holds the bound port
+        """
+        sampler = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sampler.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(
+            target=self._server.serve_forever, name="consumer-lag-metrics", daemon=True
+        ).start()
+        return self._server
+
+    def stop(self) -> None:
+        """Stops sampling and serving metrics."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
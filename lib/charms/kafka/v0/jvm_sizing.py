@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+r"""JVM heap and GC sizing for the Kafka snap
+
+Kafka brokers get most of their read throughput from the OS page cache rather than the
+JVM heap, so giving a broker most of the unit's memory as heap makes it slower, not faster.
+`recommend_jvm_settings` sizes the heap by role from the unit's memory limit (as seen by
+its cgroup, falling back to the host's memory) and CPU count, and returns the environment
+to set for the service together with the memory left for the page cache.
+
+Example usage:
+
+```python
+
+def _on_config_changed(self, event):
+    settings = recommend_jvm_settings(role="broker")
+    environment = "\n".join(
+        f"{key}='{settings[key]}'" for key in ("KAFKA_HEAP_OPTS", "KAFKA_JVM_PERFORMANCE_OPTS")
+    )
+    self.write_environment(environment)
+```
+"""
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# The unique Charmhub library identifier, never change it
+LIBID = "6559498b21f94d15b15a190053e06823"
+
+# Increment this major API version when introducing breaking changes
+LIBAPI = 0
+
+# Increment this PATCH version before using `charmcraft publish-lib` or reset
+# to 0 if you are raising the major API version
+LIBPATCH = 2
+
+
+MiB = 1024**2
+GiB = 1024**3
+
+CGROUP_V2_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+CGROUP_V1_MEMORY_LIMIT = "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+# cgroup v1 reports "no limit" as a page-aligned value near the max int64
+UNLIMITED_THRESHOLD = 2**60
+
+# fraction of memory given to the heap, and the bounds it is clamped to, per role
+HEAP_PROFILES = {
+    # brokers serve reads from the page cache, so keep their heap small
+    "broker": {"fraction": 0.25, "min": 512 * MiB, "max": 6 * GiB},
+    # KRaft controllers only hold the metadata log
+    "controller": {"fraction": 0.25, "min": 256 * MiB, "max": 2 * GiB},
+    # ZooKeeper keeps its whole data tree in the heap
+    "zookeeper": {"fraction": 0.5, "min": 256 * MiB, "max": 4 * GiB},
+}
+# left for the OS, the JVM's off-heap memory and the snap's other processes
+RESERVED_MEMORY = 512 * MiB
+
+# Kafka's own defaults from kafka-run-class.sh, with GC threads sized to the unit
+GC_OPTS = [
+    "-XX:+UseG1GC",
+    "-XX:MaxGCPauseMillis=20",
+    "-XX:InitiatingHeapOccupancyPercent=35",
+    "-XX:+ExplicitGCInvokesConcurrent",
+    "-XX:MaxInlineLevel=15",
+    "-Djava.awt.headless=true",
+]
+
+
+def _read_int(path: str) -> Optional[int]:
+    """Reads a file holding a single integer, or returns None if it is missing or not one."""
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def memory_limit() -> int:
+    """Gets the memory available to the unit, in bytes.
+
+    Returns:
+        The cgroup v2 or v1 memory limit if set, otherwise the host's total memory
+    """
+    for path in (CGROUP_V2_MEMORY_MAX, CGROUP_V1_MEMORY_LIMIT):
+        limit = _read_int(path)
+        if limit and limit < UNLIMITED_THRESHOLD:
+            return limit
+
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def cpu_count() -> int:
+    """Gets the number of CPUs available to the unit.
+
+    Returns:
+        The cgroup CPU quota rounded up if set, otherwise the CPUs the process may run on
+    """
+    quota, period = None, None
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            raw_quota, raw_period = f.read().split()
+        if raw_quota != "max":
+            quota, period = int(raw_quota), int(raw_period)
+    except (OSError, ValueError):
+        quota, period = _read_int(CGROUP_V1_CPU_QUOTA), _read_int(CGROUP_V1_CPU_PERIOD)
+
+    cpus = len(os.sched_getaffinity(0))
+    if quota and quota > 0 and period:
+        cpus = min(cpus, -(-quota // period))
+
+    return max(cpus, 1)
+
+
+def _format_size(size: int) -> str:
+    """Formats a byte count as a JVM memory size, in whole megabytes."""
+    return f"{size // MiB}m"
+
+
+def recommend_jvm_settings(
+    role: str, memory: Optional[int] = None, cpus: Optional[int] = None
+) -> Dict[str, Any]:
+    """Recommends heap and GC settings for a Kafka snap service.
+
+    Args:
+        role: one of `broker`, `controller` or `zookeeper`
+        memory (optional): memory available to the unit, in bytes. Detected if not given
+        cpus (optional): CPUs available to the unit. Detected if not given
+
+    Returns:
+        Dict with keys:
+            `KAFKA_HEAP_OPTS`: the `-Xms`/`-Xmx` flags, set equal to avoid heap resizing
+            `KAFKA_JVM_PERFORMANCE_OPTS`: the GC flags
+            `heap_size`: the heap size, in bytes
+            `page_cache_headroom`: memory left for the page cache, in bytes
+
+    Raises:
+        ValueError: if the role is unknown
+    """
+    if role not in HEAP_PROFILES:
+        raise ValueError(f"role must be one of {sorted(HEAP_PROFILES)}, got {role!r}")
+
+    memory = memory if memory is not None else memory_limit()
+    cpus = cpus if cpus is not None else cpu_count()
+    profile = HEAP_PROFILES[role]
+
+    heap_size = int(memory * profile["fraction"])
+    heap_size = max(profile["min"], min(profile["max"], heap_size))
+    # on very small units, the minimum heap must still leave room for everything else
+    heap_size = min(heap_size, max(memory - RESERVED_MEMORY, memory // 2))
+    heap_size -= heap_size % MiB
+
+    gc_opts = [
+        *GC_OPTS,
+        f"-XX:ParallelGCThreads={cpus}",
+        f"-XX:ConcGCThreads={max(1, cpus // 4)}",
+    ]
+    page_cache_headroom = max(0, memory - heap_size - RESERVED_MEMORY)
+
+    logger.debug(
+        f"{role} with {memory // MiB}MiB and {cpus} CPUs: heap {heap_size // MiB}MiB, "
+        f"page cache {page_cache_headroom // MiB}MiB"
+    )
+    return {
+        "KAFKA_HEAP_OPTS": f"-Xms{_format_size(heap_size)} -Xmx{_format_size(heap_size)}",
+        "KAFKA_JVM_PERFORMANCE_OPTS": " ".join(gc_opts),
+        "heap_size": heap_size,
+        "page_cache_headroom": page_cache_headroom,
+    }
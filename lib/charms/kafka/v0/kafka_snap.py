@@ -30,9 +30,19 @@ class KafkaCharm(CharmBase):
         self.snap.start_snap_service(snap_service="kafka")
 ```
 """
+import hashlib
+import json
 import logging
+import os
+import re
+import shlex
+import socket
 import subprocess
-from typing import List
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from charms.operator_libs_linux.v0 import apt
 from charms.operator_libs_linux.v1 import snap
@@ -47,10 +57,410 @@ LIBAPI = 0
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 4
+LIBPATCH = 17
 
 
 SNAP_CONFIG_PATH = "/var/snap/kafka/common/"
+SNAP_NAME = "kafka"
+SNAPD_BIN_PATH = "/usr/bin/snap"
+SNAPD_SOCKET_PATH = "/run/snapd.socket"
+SERVICE_ACTIONS = ("start", "stop", "restart")
+
+# short-lived admin tools get a small fixed heap, and start faster without C2 and G1
+ADMIN_TOOL_HEAP_OPTS = "-Xms256m -Xmx256m"
+ADMIN_TOOL_JVM_PERFORMANCE_OPTS = "-XX:+UseSerialGC -XX:TieredStopAtLevel=1 -Xshare:auto"
+
+BROKER_ID_PATTERN = re.compile(r"\(id: (\d+) rack:")
+ACL_RESOURCE_PATTERN = re.compile(
+    r"ResourcePattern\(resourceType=(\w+), name=(.*), patternType=(\w+)\)"
+)
+ACL_ENTRY_PATTERN = re.compile(
+    r"\(principal=(.+), host=(.+), operation=(\w+), permissionType=(\w+)\)"
+)
+TOPIC_CONFIGS_HEADER_PATTERN = re.compile(r"(?:All|Dynamic) configs for topic (\S+) are:")
+TOPIC_CONFIG_ENTRY_PATTERN = re.compile(
+    r"^\s+([^=\s]+)=(.*?) sensitive=(?:true|false) synonyms=\{(\w*)"
+)
+# `kafka.acls` flags selecting each resource type, the cluster takes no name
+ACL_RESOURCE_FLAGS = {
+    "TOPIC": "--topic",
+    "GROUP": "--group",
+    "CLUSTER": "--cluster",
+    "TRANSACTIONAL_ID": "--transactional-id",
+    "DELEGATION_TOKEN": "--delegation-token",
+    "USER": "--user-principal",
+}
+
+CONFIG_MANIFEST_FILE = ".config-manifest.json"
+SERVER_PROPERTIES_FILE = "server.properties"
+# Kafka's own default when neither `log.dirs` nor `log.dir` are set
+DEFAULT_LOG_DIRS = "/tmp/kafka-logs"
+# files only read by admin tools, which pick up changes on their next run
+NO_RESTART_FILES = {"client.properties"}
+# per-broker and cluster-wide configs Kafka can update without a restart, see
+# https://kafka.apache.org/documentation/#dynamicbrokerconfigs
+DYNAMIC_BROKER_CONFIGS = {
+    "advertised.listeners",
+    "background.threads",
+    "compression.type",
+    "follower.replication.throttled.rate",
+    "leader.replication.throttled.rate",
+    "listener.security.protocol.map",
+    "listeners",
+    "log.cleaner.backoff.ms",
+    "log.cleaner.dedupe.buffer.size",
+    "log.cleaner.delete.retention.ms",
+    "log.cleaner.io.buffer.load.factor",
+    "log.cleaner.io.buffer.size",
+    "log.cleaner.io.max.bytes.per.second",
+    "log.cleaner.max.compaction.lag.ms",
+    "log.cleaner.min.cleanable.ratio",
+    "log.cleaner.min.compaction.lag.ms",
+    "log.cleaner.threads",
+    "log.cleanup.policy",
+    "log.flush.interval.messages",
+    "log.flush.interval.ms",
+    "log.index.interval.bytes",
+    "log.index.size.max.bytes",
+    "log.message.timestamp.type",
+    "log.preallocate",
+    "log.retention.bytes",
+    "log.retention.ms",
+    "log.roll.jitter.ms",
+    "log.roll.ms",
+    "log.segment.bytes",
+    "log.segment.delete.delay.ms",
+    "max.connection.creation.rate",
+    "max.connections",
+    "max.connections.per.ip",
+    "max.connections.per.ip.overrides",
+    "message.max.bytes",
+    "metric.reporters",
+    "min.insync.replicas",
+    "num.io.threads",
+    "num.network.threads",
+    "num.recovery.threads.per.data.dir",
+    "num.replica.fetchers",
+    "replica.alter.log.dirs.io.max.bytes.per.second",
+    "sasl.enabled.mechanisms",
+    "sasl.jaas.config",
+    "ssl.cipher.suites",
+    "ssl.client.auth",
+    "ssl.enabled.protocols",
+    "ssl.endpoint.identification.algorithm",
+    "ssl.key.password",
+    "ssl.keystore.location",
+    "ssl.keystore.password",
+    "ssl.keystore.type",
+    "ssl.truststore.location",
+    "ssl.truststore.password",
+    "ssl.truststore.type",
+    "unclean.leader.election.enable",
+}
+
+
+@contextmanager
+def _timed(phase: str, timings: Dict[str, float]) -> Iterator[None]:
+    """Records the wall-clock duration of the wrapped block under `phase` in `timings`."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timings[phase] = time.monotonic() - start
+        logger.debug(f"{phase} took {timings[phase]:.3f}s")
+
+
+def parse_topics_describe(output: str) -> List[Dict[str, Any]]:
+    """Parses the per-partition lines of `kafka.topics --describe` output.
+
+    Args:
+        output: the raw command output
+
+    Returns:
+        List of dicts with `topic`, `partition`, `leader`, `replicas` and `isr` keys,
+            in the order they appear in the output. `leader` is -1 for leaderless partitions
+    """
+    partitions = []
+    for line in output.splitlines():
+        if "Partition:" not in line:
+            continue
+
+        fields = {}
+        for field in line.strip().split("\t"):
+            key, _, value = field.partition(":")
+            fields[key.strip()] = value.strip()
+
+        partitions.append(
+            {
+                "topic": fields["Topic"],
+                "partition": int(fields["Partition"]),
+                # leaderless partitions are reported as `Leader: none`
+                "leader": int(fields["Leader"]) if fields["Leader"].isdigit() else -1,
+                "replicas": [int(r) for r in fields["Replicas"].split(",") if r],
+                "isr": [int(r) for r in fields.get("Isr", "").split(",") if r],
+            }
+        )
+
+    return partitions
+
+
+def leader_skew(partitions: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Computes how far each broker is from leading the partitions it is preferred for.
+
+    As for Kafka's `leader.imbalance.per.broker.percentage`, a broker's imbalance is the
+    fraction of the partitions it is the preferred leader of, i.e first replica, that
+    currently have another leader.
+
+    Args:
+        partitions: partitions as returned by `parse_topics_describe`
+
+    Returns:
+        Dict of broker id to a dict with `preferred` and `leading` partition counts, and the
+            `imbalance` ratio
+    """
+    brokers: Dict[int, Dict[str, Any]] = {}
+    displaced: Dict[int, int] = {}
+    for partition in partitions:
+        if not partition["replicas"]:
+            continue
+        preferred = partition["replicas"][0]
+        brokers.setdefault(preferred, {"preferred": 0, "leading": 0})["preferred"] += 1
+        if partition["leader"] >= 0:
+            brokers.setdefault(partition["leader"], {"preferred": 0, "leading": 0})["leading"] += 1
+        if partition["leader"] != preferred:
+            displaced[preferred] = displaced.get(preferred, 0) + 1
+
+    for broker_id, counts in brokers.items():
+        counts["imbalance"] = (
+            displaced.get(broker_id, 0) / counts["preferred"] if counts["preferred"] else 0.0
+        )
+
+    return brokers
+
+
+class AclBinding(NamedTuple):
+    """An ALLOW ACL for any host, as managed by `KafkaSnap.apply_acls`.
+
+    Resource types, pattern types and operations are in Kafka's upper case form,
+    e.g `TOPIC`, `PREFIXED` and `DESCRIBE_CONFIGS`.
+    """
+
+    principal: str
+    resource_type: str
+    resource_name: str
+    operation: str
+    pattern_type: str = "LITERAL"
+
+    def normalized(self) -> "AclBinding":
+        """Gets the binding with its enum-like fields in upper case."""
+        return self._replace(
+            resource_type=self.resource_type.upper().replace("-", "_"),
+            operation=self.operation.upper(),
+            pattern_type=self.pattern_type.upper(),
+        )
+
+
+def parse_acls_list(output: str) -> Set[AclBinding]:
+    """Parses the output of `kafka.acls --list`.
+
+    Only ALLOW entries for any host are returned, as they are the only ones
+    `KafkaSnap.apply_acls` manages.
+
+    Args:
+        output: the raw command output
+
+    Returns:
+        Set of `AclBinding`s
+    """
+    bindings = set()
+    resource = None
+    for line in output.splitlines():
+        resource_match = ACL_RESOURCE_PATTERN.search(line)
+        if resource_match:
+            resource = resource_match.groups()
+            continue
+
+        entry_match = ACL_ENTRY_PATTERN.search(line)
+        if not entry_match or resource is None:
+            continue
+
+        principal, host, operation, permission = entry_match.groups()
+        if host != "*" or permission != "ALLOW":
+            continue
+
+        resource_type, resource_name, pattern_type = resource
+        bindings.add(
+            AclBinding(principal, resource_type, resource_name, operation, pattern_type)
+        )
+
+    return bindings
+
+
+def _group_acl_bindings(
+    bindings: Iterable[AclBinding],
+) -> List[Tuple[str, FrozenSet[str], FrozenSet[str], FrozenSet[Tuple[str, str]]]]:
+    """Groups bindings into as few `kafka.acls` invocations as possible.
+
+    One invocation applies every combination of its principals, operations and resources,
+    for a single pattern type. Bindings are first merged per principal and resource, then
+    resources sharing the same operations, then principals sharing the same operations
+    and resources.
+
+    Returns:
+        List of (pattern type, principals, operations, resources) tuples, one per invocation
+    """
+    operations: Dict[Tuple[str, str, Tuple[str, str]], Set[str]] = {}
+    for binding in bindings:
+        resource = (binding.resource_type, binding.resource_name)
+        key = (binding.pattern_type, binding.principal, resource)
+        operations.setdefault(key, set()).add(binding.operation)
+
+    resources: Dict[Tuple[str, str, FrozenSet[str]], Set[Tuple[str, str]]] = {}
+    for (pattern_type, principal, resource), ops in operations.items():
+        resources.setdefault((pattern_type, principal, frozenset(ops)), set()).add(resource)
+
+    principals: Dict[Tuple[str, FrozenSet[str], FrozenSet[Tuple[str, str]]], Set[str]] = {}
+    for (pattern_type, principal, ops), grouped in resources.items():
+        principals.setdefault((pattern_type, ops, frozenset(grouped)), set()).add(principal)
+
+    return [
+        (pattern_type, frozenset(grouped), ops, resource_set)
+        for (pattern_type, ops, resource_set), grouped in sorted(principals.items())
+    ]
+
+
+def parse_topic_configs(output: str) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """Parses the output of `kafka.configs --entity-type topics --describe`.
+
+    Args:
+        output: the raw command output, with or without `--all`
+
+    Returns:
+        Dict of topic name to a dict of config key to a dict with the effective `value`,
+            and its `source`, e.g `DYNAMIC_TOPIC_CONFIG` for topic overrides or
+            `DEFAULT_CONFIG` for Kafka's defaults
+    """
+    topics = {}
+    configs = None
+    for line in output.splitlines():
+        header_match = TOPIC_CONFIGS_HEADER_PATTERN.search(line)
+        if header_match:
+            configs = topics.setdefault(header_match.group(1), {})
+            continue
+
+        entry_match = TOPIC_CONFIG_ENTRY_PATTERN.search(line)
+        if entry_match and configs is not None:
+            key, value, source = entry_match.groups()
+            configs[key] = {"value": value, "source": source}
+
+    return topics
+
+
+def _camel_case(value: str) -> str:
+    """Converts an upper case enum name to the form the Kafka CLIs document, e.g `AlterConfigs`."""
+    return "".join(part.capitalize() for part in value.split("_"))
+
+
+def _parse_properties(content: str) -> Dict[str, str]:
+    """Parses `key=value` properties file content, ignoring blanks and comments."""
+    properties = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        key, _, value = line.partition("=")
+        properties[key.strip()] = value.strip()
+
+    return properties
+
+
+def _is_dynamic_broker_config(key: str) -> bool:
+    """Checks whether a broker config can be updated without restarting the broker."""
+    if key in DYNAMIC_BROKER_CONFIGS:
+        return True
+
+    # listener-prefixed configs, e.g `listener.name.sasl_ssl.ssl.keystore.location`
+    if key.startswith("listener.name."):
+        _, _, listener_config = key[len("listener.name.") :].partition(".")
+        return listener_config in DYNAMIC_BROKER_CONFIGS
+
+    return False
+
+
+def _write_atomic(path: str, content: str) -> None:
+    """Writes a file via a temporary file, fsync and rename, so readers never see it torn."""
+    directory = os.path.dirname(path)
+    mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _diff_topic_configs(
+    current: Dict[str, Dict[str, str]], desired: Dict[str, Optional[str]]
+) -> Tuple[Dict[str, str], List[str]]:
+    """Gets the changes bringing a topic's configs in line with the desired ones.
+
+    Args:
+        current: the topic's configs, as returned by `parse_topic_configs`
+        desired: config key to the desired value, or to None to remove the topic's override
+
+    Returns:
+        The configs to set, with their new values, and the sorted keys of the overrides
+            to remove
+    """
+    to_set, to_delete = {}, []
+    for key, value in desired.items():
+        entry = current.get(key)
+        if value is None:
+            if entry and entry["source"] == "DYNAMIC_TOPIC_CONFIG":
+                to_delete.append(key)
+        elif entry is None or entry["value"] != str(value):
+            to_set[key] = str(value)
+
+    return to_set, sorted(to_delete)
+
+
+def _alter_topic_configs_args(
+    topic: str, to_set: Dict[str, str], to_delete: List[str]
+) -> List[str]:
+    """Builds the `kafka.configs` args setting and removing a topic's configs in one call."""
+    bin_args = ["--entity-type=topics", f"--entity-name={shlex.quote(topic)}", "--alter"]
+    if to_set:
+        # list values must be bracketed, as commas separate configs
+        add_config = ",".join(
+            f"{key}=[{value}]" if "," in value else f"{key}={value}"
+            for key, value in sorted(to_set.items())
+        )
+        bin_args.append(f"--add-config={shlex.quote(add_config)}")
+    if to_delete:
+        bin_args.append(f"--delete-config={','.join(to_delete)}")
+
+    return bin_args
+
+
+def _admin_client_args(bootstrap_server: str, command_config: Optional[str]) -> List[str]:
+    """Builds the connection args every admin tool takes."""
+    bin_args = [f"--bootstrap-server={bootstrap_server}"]
+    if command_config:
+        bin_args.append(f"--command-config={command_config}")
+    return bin_args
 
 
 class KafkaSnap:
@@ -58,26 +468,108 @@ class KafkaSnap:
 
     def __init__(self) -> None:
         self.snap_config_path = SNAP_CONFIG_PATH
-        self.kafka = snap.SnapCache()["kafka"]
+        self._kafka: Optional[snap.Snap] = None
+        self._snap_client = snap.SnapClient(socket_path=SNAPD_SOCKET_PATH)
+        self.install_timings: Dict[str, float] = {}
+
+    @property
+    def kafka(self) -> snap.Snap:
+        """The Kafka `Snap`, queried from snapd on first access only.
+
+        Raises:
+            `snap.SnapError`: if snapd is not installed
+            `snap.SnapNotFoundError`: if snapd knows nothing about the Kafka snap
+            `snap.SnapAPIError`: if snapd could not be asked
+        """
+        if self._kafka is None:
+            self._kafka = self._load_kafka_snap()
+        return self._kafka
+
+    @kafka.setter
+    def kafka(self, kafka: snap.Snap) -> None:
+        """Sets the cached Kafka `Snap`."""
+        self._kafka = kafka
+
+    def _load_kafka_snap(self) -> snap.Snap:
+        """Asks snapd about the Kafka snap only, instead of building a full `SnapCache`.
+
+        Returns:
+            The installed Kafka `Snap` if present, otherwise the latest available one
+
+        Raises:
+            `snap.SnapError`: if snapd is not installed
+            `snap.SnapNotFoundError`: if snapd knows nothing about the Kafka snap
+            `snap.SnapAPIError`: if snapd could not be asked
+        """
+        if not os.path.isfile(SNAPD_BIN_PATH):
+            raise snap.SnapError("snapd is not installed or not in /usr/bin")
+
+        try:
+            info = self._snap_client.get_installed_snap_information(SNAP_NAME)
+            state = snap.SnapState.Latest
+        except snap.SnapAPIError as e:
+            # only a missing snap is worth looking up in the store, as `SnapCache` does
+            if e.code != 404:
+                raise
+            try:
+                info = self._snap_client.get_snap_information(SNAP_NAME)
+                state = snap.SnapState.Available
+            except snap.SnapAPIError as e:
+                if e.code != 404:
+                    raise
+                raise snap.SnapNotFoundError(f"Snap '{SNAP_NAME}' not found!")
+
+        return snap.Snap(
+            name=info["name"],
+            state=state,
+            channel=info["channel"],
+            revision=info["revision"],
+            confinement=info["confinement"],
+            apps=info.get("apps", None),
+            snap_client=self._snap_client,
+        )
+
+    @staticmethod
+    def snapd_ready() -> bool:
+        """Checks whether snapd is installed and its API socket is available."""
+        return os.path.isfile(SNAPD_BIN_PATH) and os.path.exists(SNAPD_SOCKET_PATH)
 
     def install(self) -> bool:
         """Loads the Kafka snap from LP, returning a StatusBase for the Charm to set.
 
+        apt is only touched when snapd itself is missing, so re-running on a unit that
+        already has the snap costs a single snapd query. The duration of each phase
+        is recorded in `install_timings`.
+
         Returns:
             True if successfully installed. False otherwise.
         """
+        self.install_timings = {}
         try:
-            apt.update()
-            apt.add_package("snapd")
-            cache = snap.SnapCache()
-            kafka = cache["kafka"]
+            with _timed("check-snapd", self.install_timings):
+                snapd_ready = self.snapd_ready()
+
+            if not snapd_ready:
+                with _timed("apt", self.install_timings):
+                    apt.update()
+                    apt.add_package("snapd")
+                # any previous lookup predates snapd
+                self._kafka = None
+
+            with _timed("check-snap", self.install_timings):
+                kafka = self.kafka
 
             if not kafka.present:
-                kafka.ensure(snap.SnapState.Latest, channel="rock/edge")
+                with _timed("snap-install", self.install_timings):
+                    kafka.ensure(snap.SnapState.Latest, channel="rock/edge")
 
-            self.kafka = kafka
             return True
-        except (snap.SnapError, apt.PackageNotFoundError) as e:
+        except (
+            snap.SnapError,
+            snap.SnapNotFoundError,
+            snap.SnapAPIError,
+            apt.PackageNotFoundError,
+        ) as e:
             logger.error(str(e))
             return False
 
@@ -92,9 +584,9 @@ class KafkaSnap:
             True if service successfully starts. False otherwise.
         """
         try:
-            self.kafka.start(services=[snap_service])
+            self.service_action("start", snap_service, wait=True)
             return True
-        except snap.SnapError as e:
+        except (snap.SnapError, snap.SnapAPIError) as e:
             logger.exception(str(e))
             return False
 
@@ -109,9 +601,9 @@ class KafkaSnap:
             True if service successfully stops. False otherwise.
         """
         try:
-            self.kafka.stop(services=[snap_service])
+            self.service_action("stop", snap_service, wait=True)
             return True
-        except snap.SnapError as e:
+        except (snap.SnapError, snap.SnapAPIError) as e:
             logger.exception(str(e))
             return False
 
@@ -126,14 +618,615 @@ class KafkaSnap:
             True if service successfully restarts. False otherwise.
         """
         try:
-            self.kafka.restart(services=[snap_service])
+            self.service_action("restart", snap_service, wait=True)
             return True
-        except snap.SnapError as e:
+        except (snap.SnapError, snap.SnapAPIError) as e:
+            logger.exception(str(e))
+            return False
+
+    def service_action(
+        self,
+        action: str,
+        snap_service: str,
+        wait: bool = False,
+        port: Optional[int] = None,
+        timeout: float = 300.0,
+    ) -> str:
+        """Posts a service action straight to snapd's `/v2/apps` endpoint.
+
+        Args:
+            action: one of `start`, `stop` or `restart`
+            snap_service: The desired service to act on
+                `kafka` or `zookeeper`
+            wait (optional): block until the snapd change is done and, unless stopping,
+                until the service reports as active. Defaults to False
+            port (optional): when waiting, also wait until this local port accepts connections
+            timeout (optional): seconds to wait before giving up. Defaults to 300s
+
+        Returns:
+            The id of the snapd change performing the action
+
+        Raises:
+            `snap.SnapError`: if the change failed, or the service is not ready in time
+            `snap.SnapAPIError`: if snapd rejected the request
+        """
+        if action not in SERVICE_ACTIONS:
+            raise ValueError(f"action must be one of {SERVICE_ACTIONS}, got {action!r}")
+
+        change_id = self._snap_client.service_action(action, [f"{SNAP_NAME}.{snap_service}"])
+        logger.debug(f"{action} {snap_service} submitted as change {change_id}")
+        if self._kafka is not None:
+            self._kafka.invalidate_services()
+        if not wait:
+            return change_id
+
+        deadline = time.monotonic() + timeout
+        self._snap_client.wait_for_change(change_id, timeout=timeout)
+        if action != "stop":
+            self._wait_for_service_ready(snap_service, port, deadline)
+
+        return change_id
+
+    def service_active(self, snap_service: str) -> bool:
+        """Checks whether snapd reports the given service as active.
+
+        Args:
+            snap_service: The service to check
+                `kafka` or `zookeeper`
+        """
+        apps = self._snap_client.get_installed_snap_apps(SNAP_NAME)
+        return any(app["name"] == snap_service and app.get("active") for app in apps)
+
+    @staticmethod
+    def port_open(port: int, host: str = "localhost") -> bool:
+        """Checks whether a TCP port accepts connections.
+
+        Args:
+            port: the port to connect to
+            host (optional): the host to connect to. Defaults to `localhost`
+        """
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return True
+        except OSError:
+            return False
+
+    def _wait_for_service_ready(
+        self, snap_service: str, port: Optional[int], deadline: float
+    ) -> None:
+        """Polls with backoff until the service is active and, if given, the port is open.
+
+        Raises:
+            `snap.SnapError`: if the service is not ready by `deadline`
+        """
+        delay = 0.05
+        while True:
+            if self.service_active(snap_service) and (port is None or self.port_open(port)):
+                return
+
+            if time.monotonic() + delay > deadline:
+                raise snap.SnapError(f"Timed out waiting for {snap_service} to become ready")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def render_config_files(self, configs: Dict[str, str]) -> Dict[str, Any]:
+        """Atomically writes config files under `snap_config_path`, skipping unchanged ones.
+
+        Content hashes are kept in a manifest alongside the files, together with their size
+        and mtime, so unchanged files are detected without re-reading them. Files edited
+        outside of this method are re-hashed and rewritten as needed.
+
+        Args:
+            configs: mapping of file name, relative to `snap_config_path`, to desired content.
+                Missing directories in a file name are created
+
+        Returns:
+            Dict with keys:
+                `changed`: list of the file names that were written
+                `restart_required`: whether the changes need a broker restart
+                `dynamic_configs`: the changed `server.properties` keys and values that
+                    could be applied with `kafka.configs --alter` instead of a restart,
+                    if no restart is required
+        """
+        manifest_path = os.path.join(self.snap_config_path, CONFIG_MANIFEST_FILE)
+        manifest = self._read_config_manifest(manifest_path)
+
+        changed = []
+        restart_required = False
+        dynamic_configs = {}
+        for filename, content in configs.items():
+            path = os.path.join(self.snap_config_path, filename)
+            digest = hashlib.sha256(content.encode()).hexdigest()
+            if self._current_config_digest(path, manifest.get(filename)) == digest:
+                continue
+
+            if filename == SERVER_PROPERTIES_FILE and os.path.exists(path):
+                with open(path) as f:
+                    current = _parse_properties(f.read())
+                desired = _parse_properties(content)
+                for key in set(current) | set(desired):
+                    if current.get(key) == desired.get(key):
+                        continue
+                    if key in desired and _is_dynamic_broker_config(key):
+                        dynamic_configs[key] = desired[key]
+                    else:
+                        restart_required = True
+            elif os.path.basename(filename) not in NO_RESTART_FILES:
+                restart_required = True
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, content)
+            stat = os.stat(path)
+            manifest[filename] = {
+                "sha256": digest,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+            changed.append(filename)
+
+        if changed:
+            _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+            logger.info(f"config files changed: {changed}, {restart_required=}")
+
+        return {
+            "changed": changed,
+            "restart_required": restart_required,
+            "dynamic_configs": {} if restart_required else dynamic_configs,
+        }
+
+    def log_dirs(self) -> List[str]:
+        """Gets the broker's log directories from `server.properties`.
+
+        Returns:
+            List of the paths set in `log.dirs`, falling back to `log.dir` and Kafka's default
+        """
+        path = os.path.join(self.snap_config_path, SERVER_PROPERTIES_FILE)
+        try:
+            with open(path) as f:
+                properties = _parse_properties(f.read())
+        except FileNotFoundError:
+            properties = {}
+
+        log_dirs = properties.get("log.dirs") or properties.get("log.dir") or DEFAULT_LOG_DIRS
+        return [log_dir.strip() for log_dir in log_dirs.split(",") if log_dir.strip()]
+
+    @staticmethod
+    def _read_config_manifest(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+        """Reads the config hash manifest, treating a missing or corrupt one as empty."""
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _current_config_digest(path: str, entry: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Gets the content hash of a config file on disk, trusting the manifest if unmodified.
+
+        Returns:
+            The hex sha256 digest of the file, or None if it does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if entry and (entry.get("size"), entry.get("mtime_ns")) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return entry.get("sha256")
+
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def follow_logs(
+        self,
+        snap_service: str,
+        pattern: Optional[str] = None,
+        num_lines: Optional[int] = 10,
+        idle_timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Streams a service's log messages from snapd as they are written.
+
+        Args:
+            snap_service: The service to follow the logs of
+                `kafka` or `zookeeper`
+            pattern (optional): regex that messages must match to be yielded
+            num_lines (optional): number of past lines to start with. Defaults to 10
+            idle_timeout (optional): stop once no new line arrived for this many seconds.
+                Defaults to following forever
+            deadline (optional): `time.monotonic()` value after which to stop following
+
+        Yields:
+            Log messages, oldest first
+
+        Raises:
+            `snap.SnapAPIError`: if snapd rejected the request
+        """
+        matcher = re.compile(pattern) if pattern else None
+        client = snap.SnapClient(socket_path=SNAPD_SOCKET_PATH, timeout=idle_timeout)
+        try:
+            for record in client.get_logs(
+                [f"{SNAP_NAME}.{snap_service}"], num_lines=num_lines, follow=True
+            ):
+                if deadline is not None and time.monotonic() > deadline:
+                    return
+
+                message = record.get("message", "")
+                if matcher is None or matcher.search(message):
+                    yield message
+        except socket.timeout:
+            logger.debug(f"no {snap_service} logs for {idle_timeout}s, stopped following")
+
+    def wait_for_log(
+        self, snap_service: str, pattern: str, timeout: float = 300.0
+    ) -> Optional[str]:
+        r"""Waits until a service logs a new line matching a pattern.
+
+        e.g `wait_for_log("daemon", r"started \(kafka.server.Kafka(Server|Raft)\)")`
+
+        Args:
+            snap_service: The service to watch the logs of
+            pattern: regex the awaited log message must match
+            timeout (optional): seconds to wait before giving up. Defaults to 300s
+
+        Returns:
+            The first matching log message, or None if there was none in time
+        """
+        messages = self.follow_logs(
+            snap_service,
+            pattern=pattern,
+            num_lines=0,
+            idle_timeout=timeout,
+            deadline=time.monotonic() + timeout,
+        )
+        return next(messages, None)
+
+    def rolling_restart(
+        self,
+        snap_service: str,
+        broker_id: int,
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+        port: Optional[int] = None,
+        timeout: float = 600.0,
+        max_delay: float = 30.0,
+    ) -> bool:
+        """Restarts the local broker and waits until it is safe to restart the next one.
+
+        The broker counts as healthy once it is registered with the cluster and there
+        are no under-replicated partitions left, which is polled with exponential backoff.
+
+        Args:
+            snap_service: The desired service to restart on the unit
+            broker_id: the id of the local broker
+            bootstrap_server: the `host:port` to run the admin tools against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the admin tools
+            command_config (optional): path to the admin client properties file
+            port (optional): the local listener port to wait for after restarting
+            timeout (optional): seconds to wait before giving up. Defaults to 600s
+            max_delay (optional): upper bound in seconds between health checks. Defaults to 30s
+
+        Returns:
+            True if the broker restarted and is healthy. False otherwise.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        try:
+            self.service_action("restart", snap_service, wait=True, port=port, timeout=timeout)
+        except (snap.SnapError, snap.SnapAPIError) as e:
             logger.exception(str(e))
             return False
 
+        delay = 1.0
+        while True:
+            try:
+                registered = broker_id in self.registered_brokers(
+                    bootstrap_server=bootstrap_server, opts=opts, command_config=command_config
+                )
+                if registered and not self.under_replicated_partitions(
+                    bootstrap_server=bootstrap_server, opts=opts, command_config=command_config
+                ):
+                    logger.info(
+                        f"broker {broker_id} healthy {time.monotonic() - start:.1f}s after restart"
+                    )
+                    return True
+            except subprocess.CalledProcessError:
+                # the cluster may not answer while the broker is coming back
+                pass
+
+            if time.monotonic() + delay > deadline:
+                logger.error(f"broker {broker_id} not healthy after {timeout}s")
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    def registered_brokers(
+        self,
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+    ) -> Set[int]:
+        """Gets the ids of the brokers currently registered with the cluster.
+
+        Args:
+            bootstrap_server: the `host:port` to run the admin tool against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            command_config (optional): path to the admin client properties file
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        bin_args = _admin_client_args(bootstrap_server, command_config)
+        output = self.run_bin_command(
+            "broker-api-versions", bin_args, opts or [], lightweight_jvm=True
+        )
+        return {int(broker_id) for broker_id in BROKER_ID_PATTERN.findall(output)}
+
+    def under_replicated_partitions(
+        self,
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Gets the partitions whose in-sync replicas are fewer than their replicas.
+
+        Args:
+            bootstrap_server: the `host:port` to run the admin tool against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            command_config (optional): path to the admin client properties file
+
+        Returns:
+            List of partitions, as returned by `parse_topics_describe`
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        bin_args = _admin_client_args(bootstrap_server, command_config)
+        bin_args += ["--describe", "--under-replicated-partitions"]
+        return parse_topics_describe(
+            self.run_bin_command("topics", bin_args, opts or [], lightweight_jvm=True)
+        )
+
+    def apply_acls(
+        self,
+        bindings: Iterable[AclBinding],
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+        principals: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Makes a set of ACLs current, with one listing and as few changes as possible.
+
+        Existing ACLs are listed once and diffed against the desired ones. Missing ACLs are
+        added and extra ones removed, grouping bindings that share operations, resources and
+        principals into single `kafka.acls` invocations.
+
+        Args:
+            bindings: the desired ALLOW ACLs
+            bootstrap_server: the `host:port` to run the admin tool against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            command_config (optional): path to the admin client properties file
+            principals (optional): the principals whose ACLs are managed, extra ACLs of
+                other principals are left alone. Defaults to those in `bindings`
+
+        Returns:
+            Dict with `added` and `removed` lists of `AclBinding`s, and the number of
+                `invocations` that changed ACLs
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        desired = {binding.normalized() for binding in bindings}
+        managed = set(principals) if principals is not None else {b.principal for b in desired}
+
+        opts = opts or []
+        base_args = _admin_client_args(bootstrap_server, command_config)
+        existing = parse_acls_list(
+            self.run_bin_command("acls", [*base_args, "--list"], opts, lightweight_jvm=True)
+        )
+        to_add = desired - existing
+        to_remove = {binding for binding in existing - desired if binding.principal in managed}
+
+        invocations = 0
+        for action, changes in (("--remove", to_remove), ("--add", to_add)):
+            for pattern_type, grouped, operations, resources in _group_acl_bindings(changes):
+                bin_args = [*base_args, action, f"--resource-pattern-type={pattern_type}"]
+                if action == "--remove":
+                    bin_args.append("--force")
+                bin_args += [
+                    f"--allow-principal={shlex.quote(principal)}" for principal in sorted(grouped)
+                ]
+                bin_args += [f"--operation={_camel_case(op)}" for op in sorted(operations)]
+                for resource_type, resource_name in sorted(resources):
+                    flag = ACL_RESOURCE_FLAGS[resource_type]
+                    if resource_type != "CLUSTER":
+                        flag = f"{flag}={shlex.quote(resource_name)}"
+                    bin_args.append(flag)
+
+                self.run_bin_command("acls", bin_args, opts, lightweight_jvm=True)
+                invocations += 1
+
+        logger.info(f"ACLs: {len(to_add)} added, {len(to_remove)} removed in {invocations} calls")
+        return {
+            "added": sorted(to_add),
+            "removed": sorted(to_remove),
+            "invocations": invocations,
+        }
+
+    def describe_topic_configs(
+        self,
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Gets the effective configs of every topic with a single `kafka.configs` call.
+
+        Args:
+            bootstrap_server: the `host:port` to run the admin tool against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            command_config (optional): path to the admin client properties file
+
+        Returns:
+            Topic configs, as returned by `parse_topic_configs`
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        bin_args = _admin_client_args(bootstrap_server, command_config)
+        bin_args += ["--entity-type=topics", "--describe", "--all"]
+        return parse_topic_configs(
+            self.run_bin_command("configs", bin_args, opts or [], lightweight_jvm=True)
+        )
+
+    def apply_topic_configs(
+        self,
+        spec: Dict[str, Dict[str, Optional[str]]],
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+        max_workers: int = 4,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Brings topic configs in line with a spec, only altering the topics that differ.
+
+        All topic configs are described once. `kafka.configs --alter` only takes one
+        entity at a time, so each differing topic then gets a single invocation carrying
+        all of its changes, run up to `max_workers` at a time.
+
+        Args:
+            spec: dict of topic name to a dict of config key to the desired value, or to
+                None to remove the topic's override and fall back to the broker default
+            bootstrap_server: the `host:port` to run the admin tool against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            command_config (optional): path to the admin client properties file
+            max_workers (optional): how many topics to alter concurrently. Defaults to 4
+
+        Returns:
+            Dict of topic name to a dict with keys:
+                `set`: the configs that were set, with their new values
+                `deleted`: the config keys whose overrides were removed
+                `error`: the tool's stderr if altering the topic failed, otherwise None
+            Topics that already matched the spec, or that do not exist, are left out
+
+        Raises:
+            `subprocess.CalledProcessError`: if describing the configs failed
+        """
+        opts = opts or []
+        current = self.describe_topic_configs(bootstrap_server, opts, command_config)
+
+        changes = {}
+        for topic, desired in spec.items():
+            if topic not in current:
+                logger.warning(f"topic {topic} does not exist, skipping its configs")
+                continue
+
+            to_set, to_delete = _diff_topic_configs(current[topic], desired)
+            if to_set or to_delete:
+                changes[topic] = {"set": to_set, "deleted": to_delete, "error": None}
+
+        def alter(topic: str) -> None:
+            bin_args = _admin_client_args(bootstrap_server, command_config)
+            bin_args += _alter_topic_configs_args(
+                topic, changes[topic]["set"], changes[topic]["deleted"]
+            )
+            try:
+                self.run_bin_command("configs", bin_args, opts, lightweight_jvm=True)
+            except subprocess.CalledProcessError as e:
+                changes[topic]["error"] = e.stderr
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            list(executor.map(alter, sorted(changes)))
+
+        logger.info(f"altered configs of {len(changes)} of {len(spec)} topics")
+        return changes
+
+    def elect_preferred_leaders(
+        self,
+        bootstrap_server: str,
+        opts: Optional[List[str]] = None,
+        command_config: Optional[str] = None,
+        threshold: float = 0.1,
+        batch_size: int = 5000,
+        partitions: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """Moves leadership back to preferred leaders, only where brokers are skewed.
+
+        Only partitions whose preferred leader is in sync, and belongs to a broker whose
+        imbalance exceeds `threshold`, are elected. They are passed to
+        `kafka.leader-election` through `--path-to-json-file`, so one invocation covers
+        up to `batch_size` partitions.
+
+        Args:
+            bootstrap_server: the `host:port` to run the admin tools against
+            opts (optional): the desired `KAFKA_OPTS` env var values for the commands
+            command_config (optional): path to the admin client properties file
+            threshold (optional): imbalance ratio above which a broker's partitions are
+                elected. Defaults to 0.1, Kafka's own default
+            batch_size (optional): upper bound on partitions per invocation. Defaults to 5000
+            partitions (optional): current partition states, as returned by
+                `parse_topics_describe`. Described with `kafka.topics` if not given
+
+        Returns:
+            Dict with the per-broker `skew` before election, as returned by `leader_skew`,
+                the `elected` `(topic, partition)` pairs and the number of `invocations`
+
+        Raises:
+            `subprocess.CalledProcessError`: if the error returned a non-zero exit code
+        """
+        opts = opts or []
+        base_args = _admin_client_args(bootstrap_server, command_config)
+        if partitions is None:
+            output = self.run_bin_command(
+                "topics", [*base_args, "--describe"], opts, lightweight_jvm=True
+            )
+            partitions = parse_topics_describe(output)
+
+        skew = leader_skew(partitions)
+        skewed = {
+            broker_id for broker_id, counts in skew.items() if counts["imbalance"] > threshold
+        }
+        elected = [
+            (partition["topic"], partition["partition"])
+            for partition in partitions
+            if partition["replicas"]
+            and partition["replicas"][0] in skewed
+            and partition["leader"] != partition["replicas"][0]
+            and partition["replicas"][0] in partition["isr"]
+        ]
+
+        invocations = 0
+        for start in range(0, len(elected), max(1, batch_size)):
+            batch = elected[start : start + max(1, batch_size)]
+            content = json.dumps(
+                {"partitions": [{"topic": topic, "partition": index} for topic, index in batch]}
+            )
+            # written under the snap's directory, so a strictly confined snap can read it
+            fd, path = tempfile.mkstemp(dir=self.snap_config_path, suffix=".json")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(content)
+                self.run_bin_command(
+                    "leader-election",
+                    [*base_args, "--election-type=PREFERRED", f"--path-to-json-file={path}"],
+                    opts,
+                    lightweight_jvm=True,
+                )
+            finally:
+                os.unlink(path)
+            invocations += 1
+
+        logger.info(
+            f"elected preferred leaders of {len(elected)} partitions on brokers {sorted(skewed)}"
+        )
+        return {"skew": skew, "elected": elected, "invocations": invocations}
+
     @staticmethod
-    def run_bin_command(bin_keyword: str, bin_args: List[str], opts: List[str]) -> str:
+    def run_bin_command(
+        bin_keyword: str, bin_args: List[str], opts: List[str], lightweight_jvm: bool = False
+    ) -> str:
         """Runs kafka bin command with desired args.
 
         Args:
@@ -141,6 +1234,8 @@ class KafkaSnap:
                 e.g `configs`, `topics` etc
             bin_args: the shell command args
             opts (optional): the desired `KAFKA_OPTS` env var values for the command
+            lightweight_jvm (optional): run with a small, fixed heap and JVM flags tuned
+                for fast startup, instead of the broker's settings. Defaults to False
 
         Returns:
             String of kafka bin command output
@@ -151,6 +1246,12 @@ class KafkaSnap:
         args_string = " ".join(bin_args)
         opts_string = " ".join(opts)
         command = f"KAFKA_OPTS={opts_string} kafka.{bin_keyword} {args_string}"
+        if lightweight_jvm:
+            command = (
+                f"KAFKA_HEAP_OPTS={shlex.quote(ADMIN_TOOL_HEAP_OPTS)} "
+                f"KAFKA_JVM_PERFORMANCE_OPTS={shlex.quote(ADMIN_TOOL_JVM_PERFORMANCE_OPTS)} "
+                f"{command}"
+            )
 
         try:
             output = subprocess.check_output(
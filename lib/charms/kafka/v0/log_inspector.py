@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Pure-Python inspection of Kafka broker log directories
+
+Walks the partition directories under a broker's `log.dirs` and reads segment headers,
+`.index` and `.timeindex` files through `mmap`, without starting a JVM. Only the first
+record batch header of each segment, and the batches after its last offset index entry,
+are read, so inspecting a partition costs roughly one page per segment rather than
+the size of its data.
+
+For each partition it reports on-disk size, segment count, start and end offsets,
+oldest and newest record timestamps, and any offset or time indexes that fail basic
+sanity checks. Partitions are yielded one at a time, and `summarize_log_dirs` folds
+them into per-topic totals.
+
+Example usage with `KafkaSnap`:
+
+```python
+
+def _on_collect_status(self, event):
+    for partition in iter_partitions(self.snap.log_dirs()):
+        if partition["unhealthy_indexes"]:
+            logger.warning(f"bad indexes: {partition['unhealthy_indexes']}")
+
+    usage = summarize_log_dirs(self.snap.log_dirs())
+    logger.info({topic: stats["size"] for topic, stats in usage.items()})
+```
+"""
+import logging
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The unique Charmhub library identifier, never change it
+LIBID = "764aa8fbbc6c46ceae7ea9494773f6f2"
+
+# Increment this major API version when introducing breaking changes
+LIBAPI = 0
+
+# Increment this PATCH version before using `charmcraft publish-lib` or reset
+# to 0 if you are raising the major API version
+LIBPATCH = 1
+
+
+# relative offset, physical position in the segment
+OFFSET_INDEX_ENTRY = struct.Struct(">ii")
+# timestamp, relative offset
+TIME_INDEX_ENTRY = struct.Struct(">qi")
+# base offset, batch length, partition leader epoch, magic, crc, attributes,
+# last offset delta, base timestamp, max timestamp
+BATCH_HEADER = struct.Struct(">qiibIhiqq")
+# base offset and batch length precede the counted batch length
+LOG_OVERHEAD = 12
+RECORD_BATCH_MAGIC = 2
+NO_TIMESTAMP = -1
+
+
+def _mmap_file(path: str) -> Optional[mmap.mmap]:
+    """Maps a file read-only, or returns None if it is missing or empty."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+def _valid_entries(buf: mmap.mmap, entry_size: int) -> int:
+    """Counts the written entries of an index, ignoring its zero-filled preallocated tail.
+
+    Written entries are never all zeros, so the first zero entry is found by binary search.
+    """
+    zero = bytes(entry_size)
+    low, high = 0, len(buf) // entry_size
+    while low < high:
+        middle = (low + high) // 2
+        if buf[middle * entry_size : (middle + 1) * entry_size] == zero:
+            high = middle
+        else:
+            low = middle + 1
+
+    return low
+
+
+def _inspect_offset_index(path: str, log_size: int) -> Tuple[int, int, Optional[str]]:
+    """Reads a `.index` file.
+
+    Returns:
+        Tuple of the number of entries, the segment position of the last one,
+            and a description of the first problem found, if any
+    """
+    buf = _mmap_file(path)
+    if buf is None:
+        return 0, 0, None
+
+    with buf:
+        if len(buf) % OFFSET_INDEX_ENTRY.size:
+            return 0, 0, f"size {len(buf)} is not a multiple of {OFFSET_INDEX_ENTRY.size}"
+
+        entries = _valid_entries(buf, OFFSET_INDEX_ENTRY.size)
+        last_offset, last_position = -1, 0
+        with memoryview(buf) as view:
+            for offset, position in OFFSET_INDEX_ENTRY.iter_unpack(
+                view[: entries * OFFSET_INDEX_ENTRY.size]
+            ):
+                if offset <= last_offset:
+                    return entries, 0, f"offset {offset} is not after {last_offset}"
+                if position < last_position or position >= log_size:
+                    return entries, 0, f"position {position} is out of order or range"
+                last_offset, last_position = offset, position
+
+    return entries, last_position, None
+
+
+def _inspect_time_index(path: str) -> Tuple[int, Optional[int], Optional[str]]:
+    """Reads a `.timeindex` file.
+
+    Returns:
+        Tuple of the number of entries, the timestamp of the last one if any,
+            and a description of the first problem found, if any
+    """
+    buf = _mmap_file(path)
+    if buf is None:
+        return 0, None, None
+
+    with buf:
+        if len(buf) % TIME_INDEX_ENTRY.size:
+            return 0, None, f"size {len(buf)} is not a multiple of {TIME_INDEX_ENTRY.size}"
+
+        entries = _valid_entries(buf, TIME_INDEX_ENTRY.size)
+        last_timestamp, last_offset = None, -1
+        with memoryview(buf) as view:
+            for timestamp, offset in TIME_INDEX_ENTRY.iter_unpack(
+                view[: entries * TIME_INDEX_ENTRY.size]
+            ):
+                if (last_timestamp is not None and timestamp < last_timestamp) or (
+                    offset < last_offset
+                ):
+                    return entries, None, f"entry ({timestamp}, {offset}) is out of order"
+                last_timestamp, last_offset = timestamp, offset
+
+    return entries, last_timestamp, None
+
+
+def inspect_segment(log_path: str) -> Dict[str, Any]:
+    """Inspects one segment from its `.log` file and the indexes next to it.
+
+    Args:
+        log_path: path to the segment's `.log` file
+
+    Returns:
+        Dict with `base_offset`, `size`, `index_size`, `last_offset`, `oldest_timestamp`,
+            `newest_timestamp` and `unhealthy_indexes` keys. Timestamps are in ms since
+            the epoch and are None, like `last_offset`, for empty segments
+    """
+    stem = log_path[: -len(".log")]
+    base_offset = int(os.path.basename(stem))
+    index_path, time_index_path = f"{stem}.index", f"{stem}.timeindex"
+
+    log_size = os.path.getsize(log_path)
+    index_entries, scan_from, index_problem = _inspect_offset_index(index_path, log_size)
+    _, indexed_timestamp, time_index_problem = _inspect_time_index(time_index_path)
+
+    unhealthy_indexes = []
+    for path, problem in ((index_path, index_problem), (time_index_path, time_index_problem)):
+        if problem:
+            logger.warning(f"{path}: {problem}")
+            unhealthy_indexes.append(path)
+
+    oldest_timestamp, newest_timestamp, last_offset = None, indexed_timestamp, None
+    buf = _mmap_file(log_path)
+    if buf is not None:
+        with buf:
+            # the first batch gives the oldest timestamp, and only the batches after the
+            # last indexed position need walking to find the last offset
+            position = 0
+            while position + BATCH_HEADER.size <= len(buf):
+                batch = BATCH_HEADER.unpack_from(buf, position)
+                batch_offset, batch_length, _, magic, _, _, last_delta, base_ts, max_ts = batch
+                if batch_length <= 0:
+                    break
+
+                if magic == RECORD_BATCH_MAGIC:
+                    last_offset = batch_offset + last_delta
+                    if position == 0 and base_ts != NO_TIMESTAMP:
+                        oldest_timestamp = base_ts
+                    if max_ts != NO_TIMESTAMP and (
+                        newest_timestamp is None or max_ts > newest_timestamp
+                    ):
+                        newest_timestamp = max_ts
+
+                if position == 0 and index_problem is None and scan_from > 0:
+                    position = scan_from
+                else:
+                    position += LOG_OVERHEAD + batch_length
+
+    return {
+        "base_offset": base_offset,
+        "size": log_size,
+        "index_size": sum(
+            os.path.getsize(path)
+            for path in (index_path, time_index_path)
+            if os.path.exists(path)
+        ),
+        "index_entries": index_entries,
+        "last_offset": last_offset,
+        "oldest_timestamp": oldest_timestamp,
+        "newest_timestamp": newest_timestamp,
+        "unhealthy_indexes": unhealthy_indexes,
+    }
+
+
+def _parse_partition_dir(name: str) -> Optional[Tuple[str, int]]:
+    """Splits a `<topic>-<partition>` directory name, ignoring deleted or future replicas."""
+    topic, _, partition = name.rpartition("-")
+    if not topic or not partition.isdigit():
+        return None
+
+    return topic, int(partition)
+
+
+def inspect_partition(path: str) -> Dict[str, Any]:
+    """Aggregates the segments of a partition directory, one segment at a time.
+
+    Args:
+        path: path to the `<topic>-<partition>` directory
+
+    Returns:
+        Dict with `segments`, `size`, `index_size`, `log_start_offset`, `log_end_offset`,
+            `oldest_timestamp`, `newest_timestamp` and `unhealthy_indexes` keys
+    """
+    partition = {
+        "segments": 0,
+        "size": 0,
+        "index_size": 0,
+        "log_start_offset": None,
+        "log_end_offset": None,
+        "oldest_timestamp": None,
+        "newest_timestamp": None,
+        "unhealthy_indexes": [],
+    }
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".log") or not entry.is_file():
+                continue
+
+            segment = inspect_segment(entry.path)
+            partition["segments"] += 1
+            partition["size"] += segment["size"]
+            partition["index_size"] += segment["index_size"]
+            partition["unhealthy_indexes"] += segment["unhealthy_indexes"]
+            partition["log_start_offset"] = _fold(
+                min, partition["log_start_offset"], segment["base_offset"]
+            )
+            if segment["last_offset"] is not None:
+                partition["log_end_offset"] = _fold(
+                    max, partition["log_end_offset"], segment["last_offset"] + 1
+                )
+            partition["oldest_timestamp"] = _fold(
+                min, partition["oldest_timestamp"], segment["oldest_timestamp"]
+            )
+            partition["newest_timestamp"] = _fold(
+                max, partition["newest_timestamp"], segment["newest_timestamp"]
+            )
+
+    return partition
+
+
+def _fold(func, current: Optional[int], value: Optional[int]) -> Optional[int]:
+    """Applies `min` or `max` to two values, either of which may be None."""
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return func(current, value)
+
+
+def iter_partitions(log_dirs: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yields the stats of every partition in the given log directories.
+
+    Args:
+        log_dirs: the broker's `log.dirs`
+
+    Yields:
+        Dicts as returned by `inspect_partition`, plus `log_dir`, `topic` and `partition` keys
+    """
+    for log_dir in log_dirs:
+        try:
+            entries = sorted(os.scandir(log_dir), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            logger.warning(f"log dir {log_dir} does not exist")
+            continue
+
+        for entry in entries:
+            parsed = _parse_partition_dir(entry.name)
+            if parsed is None or not entry.is_dir():
+                continue
+
+            topic, partition = parsed
+            yield {
+                "log_dir": log_dir,
+                "topic": topic,
+                "partition": partition,
+                **inspect_partition(entry.path),
+            }
+
+
+def summarize_log_dirs(log_dirs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Aggregates partition stats per topic.
+
+    Args:
+        log_dirs: the broker's `log.dirs`
+
+    Returns:
+        Dict of topic name to a dict with `size`, `index_size`, `segments`,
+            `oldest_timestamp`, `newest_timestamp` and `partitions` keys, the latter
+            mapping partition number to its stats from `iter_partitions`
+    """
+    topics = {}
+    for partition in iter_partitions(log_dirs):
+        topic = topics.setdefault(
+            partition["topic"],
+            {
+                "size": 0,
+                "index_size": 0,
+                "segments": 0,
+                "oldest_timestamp": None,
+                "newest_timestamp": None,
+                "partitions": {},
+            },
+        )
+        topic["size"] += partition["size"]
+        topic["index_size"] += partition["index_size"]
+        topic["segments"] += partition["segments"]
+        topic["oldest_timestamp"] = _fold(
+            min, topic["oldest_timestamp"], partition["oldest_timestamp"]
+        )
+        topic["newest_timestamp"] = _fold(
+            max, topic["newest_timestamp"], partition["newest_timestamp"]
+        )
+        topic["partitions"][partition["partition"]] = partition
+
+    return topics
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Partition reassignment planning for `kafka.reassign-partitions`
+
+`plan_reassignment` takes the current replica assignments, as parsed from
+`kafka.topics --describe` by `parse_topics_describe`, the on-disk size of each partition
+and the brokers that should hold them, and returns the partitions whose replicas need to
+move. Replicas on brokers that are no longer wanted are always moved, to a rack the
+partition is not in yet where possible. Then replicas are moved off brokers whose share of
+the data exceeds their share of the capacity, largest first, each to the least loaded
+broker that does not already hold the partition and keeps it spread over as many racks.
+Brokers are picked from a heap, so planning 100k partitions takes around a second.
+
+`batch_reassignment` then splits the plan into batches of bounded size, each with the
+replication throttle needed to move it in a given time.
+
+Example usage with `KafkaSnap`:
+
+```python
+
+def _on_rebalance_action(self, event):
+    output = KafkaSnap.run_bin_command(
+        "topics", ["--bootstrap-server=localhost:9092", "--describe"], opts=[]
+    )
+    moves = plan_reassignment(
+        partitions=parse_topics_describe(output),
+        sizes=self.partition_sizes(),
+        brokers={0: {"rack": "az1"}, 1: {"rack": "az2"}, 2: {"rack": "az3", "capacity": 2}},
+    )
+    for batch in batch_reassignment(moves, sizes=self.partition_sizes()):
+        path = self.write_plan(json.dumps(batch["reassignment"]))
+        KafkaSnap.run_bin_command(
+            "reassign-partitions",
+            [
+                "--bootstrap-server=localhost:9092",
+                f"--reassignment-json-file={path}",
+                f"--throttle={batch['throttle']}",
+                "--execute",
+            ],
+            opts=[],
+        )
+        self.wait_for_reassignment(path)
+```
+"""
+import heapq
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The unique Charmhub library identifier, never change it
+LIBID = "c0bb84aa16d845f19829d28fc2d08314"
+
+# Increment this major API version when introducing breaking changes
+LIBAPI = 0
+
+# Increment this PATCH version before using `charmcraft publish-lib` or reset
+# to 0 if you are raising the major API version
+LIBPATCH = 3
+
+
+REASSIGNMENT_VERSION = 1
+# 10MiB/s, the throttle used when a batch moves next to no data
+MIN_THROTTLE_RATE = 10 * 1024**2
+
+PartitionKey = Tuple[str, int]
+
+
+class _Placer:
+    """Tracks broker load and picks the least loaded eligible broker for a replica."""
+
+    def __init__(self, brokers: Dict[int, Dict[str, Any]], load: Dict[int, float]):
+        self.racks = {broker_id: info.get("rack") for broker_id, info in brokers.items()}
+        self.weights = {
+            broker_id: float(info.get("capacity", 1.0)) for broker_id, info in brokers.items()
+        }
+        self.load = load
+        self.heap = [
+            (load[broker_id] / weight, broker_id) for broker_id, weight in self.weights.items()
+        ]
+        heapq.heapify(self.heap)
+
+    def _ratio(self, broker_id: int) -> float:
+        """Gets a broker's load relative to its capacity."""
+        return self.load[broker_id] / self.weights[broker_id]
+
+    def add(self, broker_id: int, size: float) -> None:
+        """Adds load to a broker, leaving its stale heap entry to be skipped later."""
+        self.load[broker_id] += size
+        heapq.heappush(self.heap, (self._ratio(broker_id), broker_id))
+
+    def remove(self, broker_id: int, size: float) -> None:
+        """Removes load from a broker."""
+        self.add(broker_id, -size)
+
+    def pick(
+        self,
+        replicas: List[int],
+        replaced: int,
+        size: float,
+        limit: Optional[Dict[int, float]],
+    ) -> Optional[int]:
+        """Gets the least loaded broker that can take a replica of a partition.
+
+        Args:
+            replicas: the partition's replicas, which the broker must not be one of
+            replaced: the replica being moved, whose rack the partition may leave
+            size: the size of the replica
+            limit (optional): per-broker load the broker must stay under after the move,
+                for optional moves. Moves without one have to happen
+
+        Returns:
+            A broker in a rack none of the other replicas are in if there is one. Otherwise
+                any eligible broker if the move has to happen, or None
+        """
+        used_racks = {self.racks.get(replica) for replica in replicas if replica != replaced}
+        skipped = []
+        fallback = None
+        chosen = None
+        while self.heap:
+            ratio, broker_id = heapq.heappop(self.heap)
+            if ratio != self._ratio(broker_id):
+                # stale entry, the broker's load has changed since it was pushed
+                continue
+            skipped.append((ratio, broker_id))
+
+            if broker_id in replicas:
+                continue
+            if limit is not None and self.load[broker_id] + size > limit[broker_id]:
+                continue
+            rack = self.racks[broker_id]
+            if rack is None or rack not in used_racks:
+                chosen = broker_id
+                break
+            if fallback is None and limit is None:
+                fallback = broker_id
+
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+
+        return chosen if chosen is not None else fallback
+
+
+def plan_reassignment(
+    partitions: Iterable[Dict[str, Any]],
+    sizes: Dict[PartitionKey, float],
+    brokers: Dict[int, Dict[str, Any]],
+    tolerance: float = 0.05,
+) -> List[Dict[str, Any]]:
+    """Plans a balanced reassignment that moves as little data as it can.
+
+    Args:
+        partitions: current assignments, dicts with `topic`, `partition` and `replicas` keys
+            as returned by `parse_topics_describe`
+        sizes: size in bytes of each partition, keyed by `(topic, partition)`. Missing
+            partitions count as empty
+        brokers: the brokers that should hold the partitions, mapped to dicts with an
+            optional `rack` and an optional relative `capacity`, defaulting to 1
+        tolerance (optional): how far, as a fraction of its fair share, a broker's load may
+            be above its share before data is moved off it. Defaults to 0.05
+
+    Returns:
+        List of dicts with `topic`, `partition`, `replicas` and `previous_replicas` keys,
+            for the partitions whose replicas change. New replicas take the position of
+            the ones they replace, so preferred leaders only change when they move
+
+    Raises:
+        ValueError: if there are not enough brokers for a partition's replication factor
+    """
+    if not brokers:
+        raise ValueError("at least one broker is needed to plan a reassignment")
+
+    assignments, hosted, orphans = _load_assignments(partitions, sizes, brokers)
+    previous = {key: list(replicas) for key, replicas in assignments.items()}
+    placer = _Placer(
+        brokers, {broker_id: sum(size for size, _ in hosted[broker_id]) for broker_id in brokers}
+    )
+
+    changed = _move_orphans(orphans, assignments, sizes, hosted, placer)
+    changed |= _rebalance(
+        assignments, hosted, placer, _fair_shares(assignments, sizes, brokers), tolerance
+    )
+
+    moves = [
+        {
+            "topic": key[0],
+            "partition": key[1],
+            "replicas": assignments[key],
+            "previous_replicas": previous[key],
+        }
+        for key in sorted(changed)
+        if assignments[key] != previous[key]
+    ]
+
+    logger.info(f"planned {len(moves)} partition moves across {len(brokers)} brokers")
+    return moves
+
+
+def _load_assignments(
+    partitions: Iterable[Dict[str, Any]],
+    sizes: Dict[PartitionKey, float],
+    brokers: Dict[int, Dict[str, Any]],
+) -> Tuple[
+    Dict[PartitionKey, List[int]],
+    Dict[int, List[Tuple[float, PartitionKey]]],
+    List[Tuple[PartitionKey, int]],
+]:
+    """Indexes the current assignments.
+
+    Returns:
+        The replicas of each partition, the `(size, partition)` replicas each broker hosts,
+            and the `(partition, broker)` replicas on brokers that are going away
+    """
+    assignments: Dict[PartitionKey, List[int]] = {}
+    hosted: Dict[int, List[Tuple[float, PartitionKey]]] = {broker_id: [] for broker_id in brokers}
+    orphans: List[Tuple[PartitionKey, int]] = []
+
+    for partition in partitions:
+        key = (partition["topic"], partition["partition"])
+        replicas = list(partition["replicas"])
+        if len(replicas) > len(brokers):
+            raise ValueError(
+                f"{key} has {len(replicas)} replicas but there are {len(brokers)} brokers"
+            )
+
+        assignments[key] = replicas
+        size = float(sizes.get(key, 0))
+        for replica in replicas:
+            if replica in brokers:
+                hosted[replica].append((size, key))
+            else:
+                orphans.append((key, replica))
+
+    return assignments, hosted, orphans
+
+
+def _fair_shares(
+    assignments: Dict[PartitionKey, List[int]],
+    sizes: Dict[PartitionKey, float],
+    brokers: Dict[int, Dict[str, Any]],
+) -> Dict[int, float]:
+    """Gets each broker's share of the total load, in proportion to its capacity."""
+    total_weight = sum(float(info.get("capacity", 1.0)) for info in brokers.values())
+    total_load = sum(
+        float(sizes.get(key, 0)) * len(replicas) for key, replicas in assignments.items()
+    )
+    return {
+        broker_id: total_load * float(info.get("capacity", 1.0)) / total_weight
+        for broker_id, info in brokers.items()
+    }
+
+
+def _move_orphans(
+    orphans: List[Tuple[PartitionKey, int]],
+    assignments: Dict[PartitionKey, List[int]],
+    sizes: Dict[PartitionKey, float],
+    hosted: Dict[int, List[Tuple[float, PartitionKey]]],
+    placer: _Placer,
+) -> Set[PartitionKey]:
+    """Moves the replicas on brokers that are going away, wherever they fit best.
+
+    Returns:
+        The partitions that changed
+    """
+    changed = set()
+    for key, replica in orphans:
+        replicas = assignments[key]
+        size = float(sizes.get(key, 0))
+        target = placer.pick(replicas, replica, size, limit=None)
+        if target is None:
+            raise ValueError(f"no broker can take the replica of {key} on broker {replica}")
+        replicas[replicas.index(replica)] = target
+        placer.add(target, size)
+        hosted[target].append((size, key))
+        changed.add(key)
+
+    return changed
+
+
+def _rebalance(
+    assignments: Dict[PartitionKey, List[int]],
+    hosted: Dict[int, List[Tuple[float, PartitionKey]]],
+    placer: _Placer,
+    fair: Dict[int, float],
+    tolerance: float,
+) -> Set[PartitionKey]:
+    """Moves the largest replicas off overloaded brokers, without undershooting.
+
+    Returns:
+        The partitions that changed
+    """
+    load = placer.load
+    upper = {broker_id: share * (1 + tolerance) for broker_id, share in fair.items()}
+    changed = set()
+    for broker_id in sorted(fair, key=lambda b: load[b] - upper[b], reverse=True):
+        for size, key in sorted(hosted[broker_id], reverse=True):
+            if load[broker_id] <= upper[broker_id]:
+                break
+            replicas = assignments[key]
+            if size <= 0 or size > load[broker_id] - fair[broker_id] or broker_id not in replicas:
+                continue
+
+            target = placer.pick(replicas, broker_id, size, limit=upper)
+            if target is None:
+                continue
+            replicas[replicas.index(broker_id)] = target
+            placer.remove(broker_id, size)
+            placer.add(target, size)
+            hosted[target].append((size, key))
+            changed.add(key)
+
+    return changed
+
+
+def batch_reassignment(
+    moves: List[Dict[str, Any]],
+    sizes: Dict[PartitionKey, float],
+    max_batch_bytes: float = 50 * 1024**3,
+    max_batch_partitions: int = 1000,
+    target_seconds: float = 3600.0,
+    max_throttle_rate: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Splits a reassignment plan into throttled batches.
+
+    Args:
+        moves: the partition moves, as returned by `plan_reassignment`
+        sizes: size in bytes of each partition, keyed by `(topic, partition)`
+        max_batch_bytes (optional): upper bound on the data a batch copies. Defaults to 50GiB
+        max_batch_partitions (optional): upper bound on partitions per batch. Defaults to 1000
+        target_seconds (optional): how long each batch should take to copy. Defaults to 1h
+        max_throttle_rate (optional): upper bound for the throttle, in bytes/s
+
+    Returns:
+        List of dicts with keys:
+            `reassignment`: the `--reassignment-json-file` content for the batch
+            `bytes`: the data the batch copies
+            `throttle`: the `--throttle` value, in bytes/s, which sets
+                `leader.replication.throttled.rate` and `follower.replication.throttled.rate`.
+                It is sized so the broker sending or receiving the most data in the batch
+                finishes within `target_seconds`
+    """
+    batches = []
+    current: List[Dict[str, Any]] = []
+    current_bytes = 0.0
+
+    def flush() -> None:
+        if not current:
+            return
+        batches.append(
+            _build_batch(current, sizes, current_bytes, target_seconds, max_throttle_rate)
+        )
+        current.clear()
+
+    for move in moves:
+        key = (move["topic"], move["partition"])
+        added = set(move["replicas"]) - set(move["previous_replicas"])
+        move_bytes = float(sizes.get(key, 0)) * len(added)
+
+        if current and (
+            current_bytes + move_bytes > max_batch_bytes or len(current) >= max_batch_partitions
+        ):
+            flush()
+            current_bytes = 0.0
+
+        current.append(move)
+        current_bytes += move_bytes
+
+    flush()
+    return batches
+
+
+def _build_batch(
+    moves: List[Dict[str, Any]],
+    sizes: Dict[PartitionKey, float],
+    batch_bytes: float,
+    target_seconds: float,
+    max_throttle_rate: Optional[float],
+) -> Dict[str, Any]:
+    """Builds one batch, sizing its throttle from the busiest broker's traffic."""
+    inbound: Dict[int, float] = {}
+    outbound: Dict[int, float] = {}
+    for move in moves:
+        size = float(sizes.get((move["topic"], move["partition"]), 0))
+        added = set(move["replicas"]) - set(move["previous_replicas"])
+        # the leader is assumed to serve the copies, as it does unless it is moving too
+        source = move["previous_replicas"][0]
+        for broker_id in added:
+            inbound[broker_id] = inbound.get(broker_id, 0.0) + size
+            outbound[source] = outbound.get(source, 0.0) + size
+
+    busiest = max([*inbound.values(), *outbound.values(), 0.0])
+    throttle = max(MIN_THROTTLE_RATE, int(-(-busiest // target_seconds)))
+    if max_throttle_rate is not None:
+        throttle = min(throttle, int(max_throttle_rate))
+
+    return {
+        "reassignment": {
+            "version": REASSIGNMENT_VERSION,
+            "partitions": [
+                {
+                    "topic": move["topic"],
+                    "partition": move["partition"],
+                    "replicas": move["replicas"],
+                }
+                for move in moves
+            ],
+        },
+        "bytes": batch_bytes,
+        "throttle": throttle,
+    }
@@ -54,23 +54,39 @@ try:
 except snap.SnapError as e:
     logger.error("An exception occurred when installing snaps. Reason: %s" % e.message)
 ```
+
+Long-running operations can also be started through `SnapClient` without blocking, and
+waited for later. snapd reports each as a change, tracked by its id:
+
+```python
+client = snap.SnapClient()
+refresh = client.snap_action("charmcraft", "refresh", channel="latest/edge")
+restart = client.service_action("restart", ["nextcloud.php-fpm"])
+...
+client.wait_for_changes([refresh, restart])
+```
 """
 
+import contextlib
 import http.client
 import json
 import logging
 import os
+import re
 import socket
 import subprocess
 import sys
+import threading
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
+import uuid
 from collections.abc import Mapping
 from datetime import datetime, timedelta, timezone
 from enum import Enum
 from subprocess import CalledProcessError, CompletedProcess
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
 
 logger = logging.getLogger(__name__)
 
@@ -82,18 +98,124 @@ LIBAPI = 1
 
 # Increment this PATCH version before using `charmcraft publish-lib` or reset
 # to 0 if you are raising the major API version
-LIBPATCH = 4
+LIBPATCH = 20
 
 
 def _cache_init(func):
     def inner(*args, **kwargs):
         if _Cache.cache is None:
-            _Cache.cache = SnapCache()
+            with _Cache.lock:
+                # another thread may have built it while this one waited
+                if _Cache.cache is None:
+                    _Cache.cache = SnapCache()
         return func(*args, **kwargs)
 
     return inner
 
 
+_instrumentation_hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_instrumentation_hook(hook: Callable[[Dict[str, Any]], None]) -> None:
+    """Call a function after every snapd request and every `snap` subprocess.
+
+    Args:
+        hook: called with a dict with keys:
+            `kind`: `request` or `subprocess`
+            `target`: the method and path, e.g. `GET snaps/kafka`, or the command, e.g.
+                `snap install`
+            `status`: the HTTP status code or exit code, None if neither was received
+            `duration`: the seconds taken
+    """
+    _instrumentation_hooks.append(hook)
+
+
+def remove_instrumentation_hook(hook: Callable[[Dict[str, Any]], None]) -> None:
+    """Stop calling a function added with `add_instrumentation_hook`."""
+    if hook in _instrumentation_hooks:
+        _instrumentation_hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def _instrumented(kind: str, target: str) -> Iterator[Dict[str, Any]]:
+    """Time a block and pass the event, whose status the block sets, to every hook."""
+    event = {"kind": kind, "target": target, "status": None}
+    started = time.monotonic()
+    try:
+        yield event
+    finally:
+        if _instrumentation_hooks:
+            event["duration"] = time.monotonic() - started
+            for hook in list(_instrumentation_hooks):
+                try:
+                    hook(event)
+                except Exception as e:
+                    logger.debug("Instrumentation hook {} failed: {}".format(hook, e))
+
+
+class InstrumentationSummary:
+    """Aggregates snapd request and `snap` subprocess timings, e.g over one charm hook.
+
+    Used as a context manager, it collects events for the duration of the block:
+
+    ```python
+    with snap.InstrumentationSummary() as timings:
+        snap.add(["jq", "yq"])
+    logger.info("snap timings: %s", timings.summary())
+    ```
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets: Dict[str, Dict[str, Any]] = {}
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        """Record an event, as an instrumentation hook."""
+        status = event["status"]
+        failed = status is None or (status >= 400 if event["kind"] == "request" else status != 0)
+        with self._lock:
+            target = self._targets.setdefault(
+                event["target"],
+                {"kind": event["kind"], "count": 0, "errors": 0, "total": 0.0, "max": 0.0},
+            )
+            target["count"] += 1
+            target["errors"] += int(failed)
+            target["total"] += event["duration"]
+            target["max"] = max(target["max"], event["duration"])
+
+    def __enter__(self) -> "InstrumentationSummary":
+        """Start recording events."""
+        add_instrumentation_hook(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop recording events."""
+        remove_instrumentation_hook(self)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get the recorded events aggregated per target, slowest in total first.
+
+        Returns:
+            Dict of target to a dict with `kind`, `count`, `errors`, and `total` and `max`
+                durations in seconds
+        """
+        with self._lock:
+            ordered = sorted(self._targets.items(), key=lambda item: -item[1]["total"])
+            return {target: dict(stats) for target, stats in ordered}
+
+
+SNAPD_SOCKET_PATH = "/run/snapd.socket"
+SNAP_BIN_PATH = "/usr/bin/snap"
+# snapd saves its state here after every change, so its mtime tells whether snaps changed
+SNAPD_STATE_PATH = "/var/lib/snapd/state.json"
+# the names of the snaps in the store, refreshed by snapd now and then
+SNAPD_NAMES_PATH = "/var/cache/snapd/names"
+PERSISTED_CACHE_VERSION = 1
+PERSISTED_SNAP_FIELDS = ("name", "channel", "revision", "confinement", "apps")
+# snapd actions that take several snaps at once
+BATCH_ACTIONS = ("install", "refresh", "remove")
+
+
 # recursive hints seems to error out pytest
 JSONType = Union[Dict[str, Any], List[Any], str, int, float]
 
@@ -101,6 +223,8 @@ JSONType = Union[Dict[str, Any], List[Any], str, int, float]
 class SnapService:
     """Data wrapper for snap services."""
 
+    __slots__ = ("daemon", "daemon_scope", "enabled", "active", "activators")
+
     def __init__(
         self,
         daemon: Optional[str] = None,
@@ -140,6 +264,11 @@ class MetaCache(type):
         """Setter for the snap cache."""
         cls._cache = cache
 
+    @property
+    def lock(cls) -> threading.Lock:
+        """Lock held while the snap cache is built."""
+        return cls._lock
+
     def __getitem__(cls, name) -> "Snap":
         """Snap cache getter."""
         return cls._cache[name]
@@ -147,6 +276,7 @@ class MetaCache(type):
 
 class _Cache(object, metaclass=MetaCache):
     _cache = None
+    _lock = threading.Lock()
 
 
 class Error(Exception):
@@ -185,6 +315,16 @@ class SnapAPIError(Error):
         )
 
 
+class _SnapdConnectionError(SnapAPIError):
+    """Raised when snapd could not be reached, or stopped answering, before any HTTP status.
+
+    It keeps the 500 code such errors have always had, but no status is recorded for it.
+    """
+
+    def __init__(self, reason: Any):
+        super().__init__({}, 500, "Not found", reason)
+
+
 class SnapState(Enum):
     """The state of a snap on the system or in the cache."""
 
@@ -222,6 +362,7 @@ class Snap(object):
         confinement: str,
         apps: Optional[List[Dict[str, str]]] = None,
         cohort: Optional[str] = "",
+        snap_client: Optional["SnapClient"] = None,
     ) -> None:
         self._name = name
         self._state = state
@@ -230,7 +371,10 @@ class Snap(object):
         self._confinement = confinement
         self._cohort = cohort
         self._apps = apps or []
-        self._snap_client = SnapClient()
+        # shared with the `SnapCache` the snap comes from, so its connections are reused
+        self._snap_client = snap_client or SnapClient()
+        self._config: Dict[str, Any] = {}
+        self._services: Optional[Dict[str, SnapService]] = None
 
     def __eq__(self, other) -> bool:
         """Equality for comparison."""
@@ -270,14 +414,18 @@ class Snap(object):
         """
         optargs = optargs or []
         _cmd = ["snap", command, self._name, *optargs]
-        try:
-            return subprocess.check_output(_cmd, universal_newlines=True)
-        except CalledProcessError as e:
-            raise SnapError(
-                "Snap: {!r}; command {!r} failed with output = {!r}".format(
-                    self._name, _cmd, e.output
+        with _instrumented("subprocess", "snap {}".format(command)) as event:
+            try:
+                output = subprocess.check_output(_cmd, universal_newlines=True)
+            except CalledProcessError as e:
+                event["status"] = e.returncode
+                raise SnapError(
+                    "Snap: {!r}; command {!r} failed with output = {!r}".format(
+                        self._name, _cmd, e.output
+                    )
                 )
-            )
+            event["status"] = 0
+            return output
 
     def _snap_daemons(
         self,
@@ -293,10 +441,18 @@ class Snap(object):
 
         _cmd = ["snap", *command, *services]
 
-        try:
-            return subprocess.run(_cmd, universal_newlines=True, check=True, capture_output=True)
-        except CalledProcessError as e:
-            raise SnapError("Could not {} for snap [{}]: {}".format(_cmd, self._name, e.stderr))
+        with _instrumented("subprocess", "snap {}".format(command[0])) as event:
+            try:
+                result = subprocess.run(
+                    _cmd, universal_newlines=True, check=True, capture_output=True
+                )
+            except CalledProcessError as e:
+                event["status"] = e.returncode
+                raise SnapError(
+                    "Could not {} for snap [{}]: {}".format(_cmd, self._name, e.stderr)
+                )
+            event["status"] = 0
+            return result
 
     def get(self, key) -> str:
         """Gets a snap configuration value.
@@ -306,6 +462,35 @@ class Snap(object):
         """
         return self._snap("get", [key]).strip()
 
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Gets several snap configuration values with a single snapd request.
+
+        Values are cached on this `Snap` until its configuration is written through it, or
+        it is refreshed in its `SnapCache`, so only keys not read before are requested.
+
+        Args:
+            keys: the keys to retrieve
+
+        Returns:
+            Dict of key to value, decoded from JSON
+
+        Raises:
+            SnapError if a key is not set, or snapd could not be queried
+        """
+        keys = list(keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in self._config]
+        if missing:
+            try:
+                self._config.update(self._snap_client.get_snap_config(self._name, missing))
+            except SnapAPIError as e:
+                raise SnapError(
+                    "Snap: {!r}; could not get config {}: {}".format(
+                        self._name, ", ".join(missing), e.body.get("message", e.message)
+                    )
+                )
+
+        return {key: self._config[key] for key in keys}
+
     def set(self, config: Dict) -> str:
         """Sets a snap configuration value.
 
@@ -314,14 +499,36 @@ class Snap(object):
         """
         args = ['{}="{}"'.format(key, val) for key, val in config.items()]
 
+        self._config.clear()
         return self._snap("set", [*args])
 
+    def set_many(self, config: Dict[str, Any]) -> None:
+        """Sets several snap configuration values atomically, with a single snapd change.
+
+        Args:
+           config: keys mapped to values, sent as JSON. A `None` value unsets the key
+
+        Raises:
+            SnapError if snapd rejected the configuration, e.g. from the snap's configure hook
+        """
+        self._config.clear()
+        try:
+            change_id = self._snap_client.set_snap_config(self._name, config)
+        except SnapAPIError as e:
+            raise SnapError(
+                "Snap: {!r}; could not set config: {}".format(
+                    self._name, e.body.get("message", e.message)
+                )
+            )
+        self._snap_client.wait_for_change(change_id)
+
     def unset(self, key) -> str:
         """Unsets a snap configuration value.
 
         Args:
             key: the key to unset
         """
+        self._config.clear()
         return self._snap("unset", [key])
 
     def start(self, services: Optional[List[str]] = None, enable: Optional[bool] = False) -> None:
@@ -333,6 +540,7 @@ class Snap(object):
         """
         args = ["start", "--enable"] if enable else ["start"]
         self._snap_daemons(args, services)
+        self.invalidate_services()
 
     def stop(self, services: Optional[List[str]] = None, disable: Optional[bool] = False) -> None:
         """Stops a snap's services.
@@ -343,6 +551,7 @@ class Snap(object):
         """
         args = ["stop", "--disable"] if disable else ["stop"]
         self._snap_daemons(args, services)
+        self.invalidate_services()
 
     def logs(self, services: Optional[List[str]] = None, num_lines: Optional[int] = 10) -> str:
         """Shows a snap services' logs.
@@ -368,6 +577,7 @@ class Snap(object):
         """
         args = ["restart", "--reload"] if reload else ["restart"]
         self._snap_daemons(args, services)
+        self.invalidate_services()
 
     def _install(self, channel: Optional[str] = "", cohort: Optional[str] = "") -> None:
         """Add a snap to the system.
@@ -461,16 +671,22 @@ class Snap(object):
                 # The snap is installed, but we are changing it (e.g., switching channels).
                 self._refresh(channel, cohort)
 
+        # configure hooks may rewrite the configuration on install or refresh
+        self._config.clear()
         self._update_snap_apps()
         self._state = state
 
     def _update_snap_apps(self) -> None:
-        """Updates a snap's apps after snap changes state."""
+        """Updates a snap's apps, and the services among them, after snap changes state."""
         try:
             self._apps = self._snap_client.get_installed_snap_apps(self._name)
         except SnapAPIError:
             logger.debug("Unable to retrieve snap apps for {}".format(self._name))
             self._apps = []
+            self._services = None
+            return
+
+        self._services = {app["name"]: SnapService(**app) for app in self._apps if "daemon" in app}
 
     @property
     def present(self) -> bool:
@@ -524,14 +740,22 @@ class Snap(object):
 
     @property
     def services(self) -> Dict:
-        """Returns (if any) the installed services of the snap."""
-        self._update_snap_apps()
-        services = {}
-        for app in self._apps:
-            if "daemon" in app:
-                services[app["name"]] = SnapService(**app).as_dict()
+        """Returns (if any) the installed services of the snap.
+
+        Services are queried from snapd on first access, and again only after this `Snap`
+        started, stopped or restarted services, changed state, or was told to forget them.
+        """
+        if self._services is None:
+            self._update_snap_apps()
+
+        return {name: service.as_dict() for name, service in (self._services or {}).items()}
 
-        return services
+    def invalidate_services(self) -> None:
+        """Forget the services read from snapd, e.g. after acting on them through `SnapClient`.
+
+        They are queried from snapd again the next time `services` is accessed.
+        """
+        self._services = None
 
 
 class _UnixSocketConnection(http.client.HTTPConnection):
@@ -550,7 +774,8 @@ class _UnixSocketConnection(http.client.HTTPConnection):
             raise NotImplementedError("Unix sockets not supported on {}".format(sys.platform))
         self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.sock.connect(self.socket_path)
-        if self.timeout is not None:
+        # constructed without a timeout, the connection gets the global default sentinel
+        if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
             self.sock.settimeout(self.timeout)
 
 
@@ -572,29 +797,34 @@ class SnapClient:
     In order to avoid shelling out and/or involving sudo in calling the snapd API,
     use a wrapper based on the Pebble Client, trimmed down to only the utility methods
     needed for talking to snapd.
+
+    Unless an opener is given, each thread keeps its own HTTP/1.1 connection to snapd
+    open between requests, and reconnects when snapd closes it.
     """
 
     def __init__(
         self,
-        socket_path: str = "/run/snapd.socket",
+        socket_path: Optional[str] = None,
         opener: Optional[urllib.request.OpenerDirector] = None,
         base_url: str = "http://localhost/v2/",
-        timeout: float = 5.0,
+        timeout: Optional[float] = 5.0,
     ):
         """Initialize a client instance.
 
         Args:
-            socket_path: a path to the socket on the filesystem. Defaults to /run/snap/snapd.socket
-            opener: specifies an opener for unix socket, if unspecified a default is used
+            socket_path: a path to the socket on the filesystem. Defaults to /run/snapd.socket
+            opener: specifies an opener for unix socket, if unspecified requests go over
+                persistent per-thread connections
             base_url: base url for making requests to the snap client. Defaults to
                 http://localhost/v2/
-            timeout: timeout in seconds to use when making requests to the API. Default is 5.0s.
+            timeout: timeout in seconds to use when making requests to the API, None to wait
+                forever. Default is 5.0s.
         """
-        if opener is None:
-            opener = self._get_default_opener(socket_path)
         self.opener = opener
+        self.socket_path = socket_path or SNAPD_SOCKET_PATH
         self.base_url = base_url
         self.timeout = timeout
+        self._local = threading.local()
 
     @classmethod
     def _get_default_opener(cls, socket_path):
@@ -606,6 +836,58 @@ class SnapClient:
         opener.add_handler(urllib.request.HTTPErrorProcessor())
         return opener
 
+    def _connection(self) -> _UnixSocketConnection:
+        """Get the calling thread's connection to snapd, creating it if needed."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _UnixSocketConnection(
+                urllib.parse.urlsplit(self.base_url).netloc,
+                timeout=self.timeout,
+                socket_path=self.socket_path,
+            )
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close the calling thread's connection to snapd, if it has one open."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+
+    def _send(
+        self, method: str, url: str, headers: Dict, data: Optional[bytes], keep_alive: bool
+    ) -> http.client.HTTPResponse:
+        """Send a request over a persistent connection, reconnecting once if it went stale.
+
+        Without `keep_alive`, a dedicated connection is used and closed with the response,
+        for responses that are streamed rather than read whole.
+        """
+        if not keep_alive:
+            connection = _UnixSocketConnection(
+                urllib.parse.urlsplit(self.base_url).netloc,
+                timeout=self.timeout,
+                socket_path=self.socket_path,
+            )
+            connection.request(method, url, body=data, headers={**headers, "Connection": "close"})
+            return connection.getresponse()
+
+        for attempt in range(2):
+            connection = self._connection()
+            reused = connection.sock is not None
+            try:
+                connection.request(method, url, body=data, headers=headers)
+                return connection.getresponse()
+            except (http.client.CannotSendRequest, http.client.ResponseNotReady):
+                # a previous response was not read to the end, nothing was sent yet
+                connection.close()
+                if attempt:
+                    raise
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # snapd closes idle connections; only a request on a fresh one is final
+                connection.close()
+                if not reused or attempt:
+                    raise
+
     def _request(
         self,
         method: str,
@@ -620,6 +902,26 @@ class SnapClient:
         as the HTTP body (with Content-Type: "application/json"). The resulting
         body is decoded from JSON.
         """
+        return self._request_document(method, path, query, body)["result"]
+
+    def _request_async(
+        self,
+        method: str,
+        path: str,
+        query: Dict = None,
+        body: Dict = None,
+    ) -> str:
+        """Make a JSON request for an asynchronous snapd operation; return its change id."""
+        return self._request_document(method, path, query, body)["change"]
+
+    def _request_document(
+        self,
+        method: str,
+        path: str,
+        query: Dict = None,
+        body: Dict = None,
+    ) -> Dict:
+        """Make a JSON request to the Snapd server; return the whole decoded response document."""
         headers = {"Accept": "application/json"}
         data = None
         if body is not None:
@@ -627,7 +929,7 @@ class SnapClient:
             headers["Content-Type"] = "application/json"
 
         response = self._request_raw(method, path, query, headers, data)
-        return json.loads(response.read().decode())["result"]
+        return json.loads(response.read().decode())
 
     def _request_raw(
         self,
@@ -636,6 +938,7 @@ class SnapClient:
         query: Dict = None,
         headers: Dict = None,
         data: bytes = None,
+        keep_alive: bool = True,
     ) -> http.client.HTTPResponse:
         """Make a request to the Snapd server; return the raw HTTPResponse object."""
         url = self.base_url + path
@@ -644,6 +947,25 @@ class SnapClient:
 
         if headers is None:
             headers = {}
+
+        with _instrumented("request", "{} {}".format(method, path)) as event:
+            try:
+                response = self._open(method, url, headers, data, keep_alive)
+            except _SnapdConnectionError:
+                raise
+            except SnapAPIError as e:
+                event["status"] = e.code
+                raise
+            event["status"] = response.status
+            return response
+
+    def _open(
+        self, method: str, url: str, headers: Dict, data: Optional[bytes], keep_alive: bool
+    ) -> http.client.HTTPResponse:
+        """Send a request with the opener or over a persistent connection."""
+        if self.opener is None:
+            return self._request_persistent(method, url, headers, data, keep_alive)
+
         request = urllib.request.Request(url, method=method, data=data, headers=headers)
 
         try:
@@ -660,13 +982,117 @@ class SnapClient:
                 message = "{} - {}".format(type(e2).__name__, e2)
             raise SnapAPIError(body, code, status, message)
         except urllib.error.URLError as e:
-            raise SnapAPIError({}, 500, "Not found", e.reason)
+            raise _SnapdConnectionError(e.reason)
+        return response
+
+    def _request_persistent(
+        self, method: str, url: str, headers: Dict, data: Optional[bytes], keep_alive: bool
+    ) -> http.client.HTTPResponse:
+        """Make a request over a persistent connection, raising errors like the opener does."""
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + ("?" + parts.query if parts.query else "")
+        try:
+            response = self._send(method, target, headers, data, keep_alive)
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            raise _SnapdConnectionError(e)
+
+        self._check_response(response)
         return response
 
+    @staticmethod
+    def _check_response(response: http.client.HTTPResponse) -> None:
+        """Raise a SnapAPIError for an error response, with the error snapd sent in it."""
+        if response.status < 400:
+            return
+
+        message = ""
+        try:
+            body = json.loads(response.read().decode())["result"]
+        except (IOError, ValueError, KeyError) as e:
+            body = {}
+            message = "{} - {}".format(type(e).__name__, e)
+        raise SnapAPIError(body, response.status, response.reason, message)
+
+    def sideload(
+        self,
+        path: str,
+        classic: bool = False,
+        dangerous: bool = False,
+        timeout: Optional[float] = 300.0,
+    ) -> str:
+        """Ask snapd to install a local .snap file, without waiting for the result.
+
+        The file is streamed to snapd with `sendfile`, straight from the page cache, so it
+        is never read into memory however large it is. The upload gets a connection of its
+        own, closed once snapd accepted the file.
+
+        Args:
+            path: the path to the .snap file
+            classic: install with classic confinement
+            dangerous: install even though the snap is not signed
+            timeout: timeout in seconds for the upload and snapd's answer to it, which take
+                much longer than other requests for large files, None to wait forever.
+                Default is 300s
+
+        Returns:
+            The id of the snapd change installing the snap. Once ready, the change's
+                `data` holds the installed snap's name as `snap-name`
+        """
+        boundary = uuid.uuid4().hex
+        fields = [
+            '--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\ntrue\r\n'.format(
+                boundary, field
+            )
+            for field, enabled in (("classic", classic), ("dangerous", dangerous))
+            if enabled
+        ]
+        fields.append(
+            '--{}\r\nContent-Disposition: form-data; name="snap"; filename="{}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n".format(
+                boundary, os.path.basename(path)
+            )
+        )
+        head = "".join(fields).encode()
+        tail = "\r\n--{}--\r\n".format(boundary).encode()
+
+        connection = _UnixSocketConnection(
+            urllib.parse.urlsplit(self.base_url).netloc,
+            timeout=timeout,
+            socket_path=self.socket_path,
+        )
+        target = urllib.parse.urlsplit(self.base_url).path + "snaps"
+        with _instrumented("request", "POST snaps") as event, open(path, "rb") as snap_file:
+            try:
+                connection.putrequest("POST", target)
+                connection.putheader(
+                    "Content-Type", "multipart/form-data; boundary={}".format(boundary)
+                )
+                size = os.fstat(snap_file.fileno()).st_size
+                connection.putheader("Content-Length", str(len(head) + size + len(tail)))
+                connection.putheader("Accept", "application/json")
+                connection.putheader("Connection", "close")
+                connection.endheaders()
+                connection.send(head)
+                connection.sock.sendfile(snap_file)
+                connection.send(tail)
+                response = connection.getresponse()
+                event["status"] = response.status
+                self._check_response(response)
+                return json.loads(response.read().decode())["change"]
+            except (OSError, http.client.HTTPException) as e:
+                raise _SnapdConnectionError(e)
+            finally:
+                connection.close()
+
     def get_installed_snaps(self) -> Dict:
         """Get information about currently installed snaps."""
         return self._request("GET", "snaps")
 
+    def get_installed_snap_information(self, name: str) -> Dict:
+        """Get information about a single, currently installed snap."""
+        return self._request("GET", "snaps/{}".format(urllib.parse.quote(name)))
+
     def get_snap_information(self, name: str) -> Dict:
         """Query the snap server for information about single snap."""
         return self._request("GET", "find", {"name": name})[0]
@@ -675,86 +1101,400 @@ class SnapClient:
         """Query the snap server for apps belonging to a named, currently installed snap."""
         return self._request("GET", "apps", {"names": name, "select": "service"})
 
+    def get_logs(
+        self,
+        services: List[str],
+        num_lines: Optional[int] = 10,
+        follow: bool = False,
+        max_line_length: int = 65536,
+    ) -> Iterator[Dict]:
+        """Stream log records for services from the snap server.
+
+        Records are read one at a time as snapd sends them, so memory use is bounded
+        by `max_line_length` however long the stream runs. When following, the stream
+        only ends once the client timeout passes without a new record.
+
+        Args:
+            services: fully-qualified service names, e.g. `kafka.daemon`, or bare snap names
+            num_lines: number of past records to start with; all of them if None. Default `10`
+            follow: keep the stream open and yield new records as they are logged
+            max_line_length: records longer than this many bytes are skipped. Default 64KiB
+
+        Yields:
+            Dicts with `timestamp`, `message`, `sid` and `pid` keys
+        """
+        query = {"names": ",".join(services), "n": -1 if num_lines is None else num_lines}
+        if follow:
+            query["follow"] = "true"
+
+        response = self._request_raw(
+            "GET", "logs", query, {"Accept": "application/json-seq"}, keep_alive=False
+        )
+        with response:
+            while True:
+                line = response.readline(max_line_length)
+                if not line:
+                    return
+
+                # records are RFC 7464 JSON text sequences: RS, JSON, LF
+                record = line.strip(b"\x1e \r\n")
+                if not record:
+                    continue
+                try:
+                    yield json.loads(record)
+                except ValueError:
+                    logger.debug("Skipping malformed or oversized log record")
+
+    def service_action(
+        self,
+        action: str,
+        services: List[str],
+        enable: bool = False,
+        disable: bool = False,
+        reload: bool = False,
+    ) -> str:
+        """Ask snapd to start, stop or restart services, without waiting for the result.
+
+        Args:
+            action: one of `start`, `stop` or `restart`
+            services: fully-qualified service names, e.g. `kafka.daemon`, or bare snap names
+            enable: enable the services on `start`
+            disable: disable the services on `stop`
+            reload: reload rather than restart the services, if supported
+
+        Returns:
+            The id of the snapd change performing the action
+        """
+        body = {"action": action, "names": services}
+        if enable:
+            body["enable"] = True
+        if disable:
+            body["disable"] = True
+        if reload:
+            body["reload"] = True
+
+        return self._request_async("POST", "apps", body=body)
+
+    def get_snap_config(self, name: str, keys: List[str]) -> Dict[str, Any]:
+        """Query the snap server for configuration values of an installed snap."""
+        path = "snaps/{}/conf".format(urllib.parse.quote(name))
+        return self._request("GET", path, {"keys": ",".join(keys)})
+
+    def set_snap_config(self, name: str, config: Dict[str, Any]) -> str:
+        """Ask snapd to set configuration values of a snap, without waiting for the result.
+
+        Returns:
+            The id of the snapd change applying the configuration
+        """
+        path = "snaps/{}/conf".format(urllib.parse.quote(name))
+        return self._request_async("PUT", path, body=config)
+
+    def snap_action(
+        self,
+        name: str,
+        action: str,
+        channel: Optional[str] = "",
+        cohort: Optional[str] = "",
+        classic: bool = False,
+        leave_cohort: bool = False,
+        revision: Optional[str] = None,
+    ) -> str:
+        """Ask snapd to install, refresh or remove a snap, without waiting for the result.
+
+        Args:
+            name: the name of the snap
+            action: one of `install`, `refresh`, `remove`, `revert`, `enable` or `disable`
+            channel: the channel to install or refresh from
+            cohort: the key of a cohort to install or refresh in
+            classic: install with classic confinement
+            leave_cohort: leave the current cohort on refresh
+            revision: a specific revision to install, refresh or revert to
+
+        Returns:
+            The id of the snapd change performing the action
+        """
+        body = {"action": action}
+        if channel:
+            body["channel"] = channel
+        if cohort:
+            body["cohort-key"] = cohort
+        if classic:
+            body["classic"] = True
+        if leave_cohort:
+            body["leave-cohort"] = True
+        if revision:
+            body["revision"] = revision
+
+        return self._request_async("POST", "snaps/{}".format(urllib.parse.quote(name)), body=body)
+
+    def snaps_action(self, action: str, names: List[str]) -> str:
+        """Ask snapd to install, refresh or remove several snaps in a single change.
+
+        snapd takes no channel, cohort or confinement options for multi-snap actions.
+
+        Args:
+            action: one of `install`, `refresh` or `remove`
+            names: the names of the snaps
+
+        Returns:
+            The id of the snapd change performing the action
+        """
+        return self._request_async("POST", "snaps", body={"action": action, "snaps": names})
+
+    def get_change(self, change_id: str) -> Dict:
+        """Query the snap server for the status of a change."""
+        return self._request("GET", "changes/{}".format(change_id))
+
+    def wait_for_change(
+        self, change_id: str, timeout: Optional[float] = 300.0, max_delay: float = 1.0
+    ) -> Dict:
+        """Poll a change with exponential backoff until snapd reports it as ready.
+
+        Args:
+            change_id: the id of the change to wait for
+            timeout: seconds to wait before giving up, None to wait until the change is
+                ready. Default is 300s
+            max_delay: upper bound in seconds for the delay between polls. Default is 1s
+
+        Raises:
+            SnapError if the change failed, or is not ready before the timeout
+        """
+        return self.wait_for_changes([change_id], timeout, max_delay)[change_id]
+
+    def wait_for_changes(
+        self,
+        change_ids: Iterable[str],
+        timeout: Optional[float] = 300.0,
+        max_delay: float = 1.0,
+    ) -> Dict[str, Dict]:
+        """Poll several changes together with exponential backoff until all are ready.
+
+        Each round polls only the changes that are still in progress, and the delay
+        between rounds doubles up to `max_delay`.
+
+        Args:
+            change_ids: the ids of the changes to wait for
+            timeout: seconds to wait before giving up, None to wait until all changes are
+                ready. Default is 300s
+            max_delay: upper bound in seconds for the delay between polls. Default is 1s
+
+        Returns:
+            Dict of change id to the final change, for every change
+
+        Raises:
+            SnapError if any change failed, once all are ready, or if some are not ready
+                before the timeout
+        """
+        pending = list(dict.fromkeys(change_ids))
+        changes = {}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.05
+        while pending:
+            for change_id in pending:
+                changes[change_id] = self.get_change(change_id)
+            pending = [change_id for change_id in pending if not changes[change_id].get("ready")]
+            if not pending:
+                break
+
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise SnapError("Timed out waiting for change(s) {}".format(", ".join(pending)))
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+        failed = [
+            "{} finished with status {}: {}".format(
+                change_id, change.get("status"), change.get("err", "")
+            )
+            for change_id, change in changes.items()
+            if change.get("status") != "Done"
+        ]
+        if failed:
+            raise SnapError("Change {}".format("; ".join(failed)))
+        return changes
+
 
 class SnapCache(Mapping):
     """An abstraction to represent installed/available packages.
 
     When instantiated, `SnapCache` iterates through the list of installed
-    snaps using the `snapd` HTTP API, and a list of available snaps by reading
-    the filesystem to populate the cache. Information about available snaps is lazily-loaded
-    from the `snapd` API when requested.
+    snaps using the `snapd` HTTP API. The names of available snaps are only read from
+    the filesystem the first time they are needed, to check membership, count or iterate.
+    Information about available snaps is lazily-loaded from the `snapd` API when requested.
+
+    Given a `persist_path`, e.g. under the charm's state directory, the installed snaps are
+    also saved to that file, and loaded from it instead of snapd as long as snapd's state
+    has not been modified since.
     """
 
-    def __init__(self):
+    def __init__(self, persist_path: Optional[str] = None):
         if not self.snapd_installed:
             raise SnapError("snapd is not installed or not in /usr/bin") from None
         self._snap_client = SnapClient()
         self._snap_map = {}
+        self._available_names: Optional[Set[str]] = None
+        self._persist_path = persist_path
+        self._lock = threading.RLock()
         if self.snapd_installed:
-            self._load_available_snaps()
             self._load_installed_snaps()
 
+    @property
+    def _available(self) -> Set[str]:
+        """The names of available snaps, read from disk on first use."""
+        if self._available_names is None:
+            self._available_names = self._load_available_snaps()
+        return self._available_names
+
     def __contains__(self, key: str) -> bool:
         """Magic method to ease checking if a given snap is in the cache."""
-        return key in self._snap_map
+        return key in self._snap_map or key in self._available
 
     def __len__(self) -> int:
         """Returns number of items in the snap cache."""
-        return len(self._snap_map)
+        return len(self._snap_map) + len(self._available.difference(self._snap_map))
 
     def __iter__(self) -> Iterable["Snap"]:
         """Magic method to provide an iterator for the snap cache."""
+        for name in self._available:
+            self._snap_map.setdefault(name, None)
         return iter(self._snap_map.values())
 
     def __getitem__(self, snap_name: str) -> Snap:
         """Return either the installed version or latest version for a given snap."""
         snap = self._snap_map.get(snap_name, None)
         if snap is None:
-            # The snapd cache file may not have existed when _snap_map was
-            # populated.  This is normal.
-            try:
-                self._snap_map[snap_name] = self._load_info(snap_name)
-            except SnapAPIError:
-                raise SnapNotFoundError("Snap '{}' not found!".format(snap_name))
+            with self._lock:
+                if self._snap_map.get(snap_name) is None:
+                    # The snapd cache file may not have existed when _snap_map was
+                    # populated.  This is normal.
+                    try:
+                        self._snap_map[snap_name] = self._load_info(snap_name)
+                    except SnapAPIError:
+                        raise SnapNotFoundError("Snap '{}' not found!".format(snap_name))
 
         return self._snap_map[snap_name]
 
+    def refresh(self, snap_name: str) -> Snap:
+        """Reload a single snap from snapd, e.g after an operation on it finished.
+
+        A cached `Snap` is updated in place, so references to it stay current, and the
+        configuration and services it cached are read from snapd again when next asked for.
+
+        Args:
+            snap_name: the name of the snap
+
+        Raises:
+            SnapNotFoundError if the snap is neither installed nor available
+        """
+        with self._lock:
+            try:
+                info = self._snap_client.get_installed_snap_information(snap_name)
+            except SnapAPIError as e:
+                if e.code != 404:
+                    raise
+                info = None
+
+            snap = self._snap_map.get(snap_name)
+            if info is None:
+                if snap is None:
+                    return self[snap_name]
+                if snap.present:
+                    snap._state = SnapState.Absent
+                    snap._config.clear()
+                return snap
+
+            if snap is None:
+                snap = self._snap_map[snap_name] = self._installed_snap(info)
+                return snap
+
+            snap._channel = info["channel"]
+            snap._revision = info["revision"]
+            snap._confinement = info["confinement"]
+            snap._apps = info.get("apps") or []
+            snap._config.clear()
+            snap.invalidate_services()
+            if not snap.present:
+                snap._state = SnapState.Latest
+            return snap
+
     @property
     def snapd_installed(self) -> bool:
         """Check whether snapd has been installled on the system."""
-        return os.path.isfile("/usr/bin/snap")
+        return os.path.isfile(SNAP_BIN_PATH)
 
-    def _load_available_snaps(self) -> None:
-        """Load the list of available snaps from disk.
+    def _load_available_snaps(self) -> Set[str]:
+        """Load the names of available snaps from disk.
 
-        Leave them empty and lazily load later if asked for.
+        Their information is lazily loaded later if asked for.
         """
-        if not os.path.isfile("/var/cache/snapd/names"):
+        if not os.path.isfile(SNAPD_NAMES_PATH):
             # The snap catalog may not be populated yet; this is normal.
             # snapd updates the cache infrequently and the cache file may not
             # currently exist.
-            return
+            return set()
 
-        with open("/var/cache/snapd/names", "r") as f:
-            for line in f:
-                if line.strip():
-                    self._snap_map[line.strip()] = None
+        with open(SNAPD_NAMES_PATH, "r") as f:
+            # one name per line, and snap names never contain whitespace
+            return set(f.read().split())
+
+    @staticmethod
+    def _snapd_state_key() -> Optional[List[int]]:
+        """Get a key that changes whenever snapd saves its state, or None if unknown."""
+        try:
+            stat = os.stat(SNAPD_STATE_PATH)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _read_persisted(self, key: List[int]) -> Optional[List[Dict]]:
+        """Read the persisted installed snaps, if they were saved with the given state key."""
+        try:
+            with open(self._persist_path, "r") as f:
+                persisted = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if persisted.get("version") != PERSISTED_CACHE_VERSION or persisted.get("key") != key:
+            return None
+        return persisted.get("snaps")
+
+    def _persist(self, key: List[int], installed: List[Dict]) -> None:
+        """Save the installed snaps with the snapd state key they were read under."""
+        snaps = [{field: i.get(field) for field in PERSISTED_SNAP_FIELDS} for i in installed]
+        document = {"version": PERSISTED_CACHE_VERSION, "key": key, "snaps": snaps}
+        temp_path = "{}.{}.tmp".format(self._persist_path, os.getpid())
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(document, f, separators=(",", ":"))
+            os.replace(temp_path, self._persist_path)
+        except OSError as e:
+            logger.debug("Unable to persist the snap cache to {}: {}".format(temp_path, e))
 
     def _load_installed_snaps(self) -> None:
         """Load the installed snaps into the dict."""
-        installed = self._snap_client.get_installed_snaps()
+        # read before snapd is queried, so changes made meanwhile invalidate what is saved
+        key = self._snapd_state_key() if self._persist_path else None
+        installed = self._read_persisted(key) if key else None
+        if installed is None:
+            installed = self._snap_client.get_installed_snaps()
+            if key:
+                self._persist(key, installed)
 
         for i in installed:
-            snap = Snap(
-                name=i["name"],
-                state=SnapState.Latest,
-                channel=i["channel"],
-                revision=i["revision"],
-                confinement=i["confinement"],
-                apps=i.get("apps", None),
-            )
+            snap = self._installed_snap(i)
             self._snap_map[snap.name] = snap
 
+    def _installed_snap(self, info: Dict) -> Snap:
+        """Build a `Snap` for an installed snap from its snapd information."""
+        return Snap(
+            name=info["name"],
+            state=SnapState.Latest,
+            channel=info["channel"],
+            revision=info["revision"],
+            confinement=info["confinement"],
+            apps=info.get("apps", None),
+            snap_client=self._snap_client,
+        )
+
     def _load_info(self, name) -> Snap:
         """Load info for snaps which are not installed if requested.
 
@@ -770,6 +1510,7 @@ class SnapCache(Mapping):
             revision=info["revision"],
             confinement=info["confinement"],
             apps=None,
+            snap_client=self._snap_client,
         )
 
 
@@ -783,6 +1524,10 @@ def add(
 ) -> Union[Snap, List[Snap]]:
     """Add a snap to the system.
 
+    Snaps that are not installed yet are installed in one snapd change when no cohort or
+    classic confinement is asked for, and the channel is the default `latest`, e.g.
+    `add(["jq", "yq"])`. Without a channel, installed snaps are refreshed together too.
+
     Args:
         snap_names: the name or names of the snaps to install
         state: a string or `SnapState` representation of the desired state, one of
@@ -847,6 +1592,120 @@ def ensure(
         return remove(snap_names)
 
 
+def _batch_action(snap: Snap, state: SnapState) -> Optional[str]:
+    """Get the snapd action bringing a snap to a state, if it can be batched with others."""
+    if state is SnapState.Absent:
+        return "remove" if snap.present else None
+    if snap.confinement == "classic":
+        # multi-snap actions cannot ask for classic confinement
+        return None
+    return "refresh" if snap.present else "install"
+
+
+def _refresh_cached(snap_name: str) -> Optional[Snap]:
+    """Reload a snap into the cache after an operation on it succeeded.
+
+    The operation is done whether or not snapd answers, so a failure is logged rather than
+    raised, and the cached snap keeps the state the operation left it in.
+
+    Returns:
+        The reloaded snap, or None if snapd could not be asked
+    """
+    try:
+        return _Cache.cache.refresh(snap_name)
+    except SnapAPIError as e:
+        logger.warning("Could not reload snap {} from snapd: {}".format(snap_name, e.message))
+        return None
+
+
+def _ensure_batched(
+    snap_names: List[str], state: SnapState, actions: Iterable[str] = BATCH_ACTIONS
+) -> List[str]:
+    """Ensure snaps are in a state, with one snapd change per action for all of them.
+
+    Only used without a channel, cohort or classic confinement, as snapd accepts none of
+    them for multi-snap actions. Actions with a single snap, and batches snapd refuses or
+    that finish with an error, are left for the caller to run one snap at a time, so
+    failures are reported per snap. A batch is waited for however long it takes, as snaps
+    of a batch still in progress could not be changed one at a time.
+
+    Args:
+        snap_names: the names of the snaps
+        state: the state to bring them to
+        actions: the actions that may be batched, others are left for the caller
+
+    Returns:
+        The names of the snaps that were brought to the state
+
+    Raises:
+        SnapError if snapd could not be asked how a batch went
+    """
+    groups = {}
+    for name in snap_names:
+        try:
+            action = _batch_action(_Cache[name], state)
+        except SnapNotFoundError:
+            continue
+        if action in actions:
+            groups.setdefault(action, []).append(name)
+
+    done = []
+    for action, names in groups.items():
+        if len(names) < 2 or not _run_batch(action, names):
+            continue
+
+        for name in names:
+            _Cache[name]._state = state
+            if state is not SnapState.Absent:
+                _refresh_cached(name)
+        done.extend(names)
+
+    return done
+
+
+def _run_batch(action: str, names: List[str]) -> bool:
+    """Run one snapd change for an action on several snaps, waiting for as long as it takes.
+
+    Args:
+        action: the snapd action, e.g. "install"
+        names: the names of the snaps
+
+    Returns:
+        Whether the change succeeded. If not, it is over, and the snaps free to retry
+
+    Raises:
+        SnapError if snapd could not be asked how the change went
+    """
+    client = _Cache.cache._snap_client
+    try:
+        change_id = client.snaps_action(action, names)
+    except SnapAPIError as e:
+        logger.debug(
+            "Batched {} of {} refused, retrying one at a time: {}".format(
+                action, ", ".join(names), e
+            )
+        )
+        return False
+
+    try:
+        client.wait_for_change(change_id, timeout=None)
+    except SnapAPIError as e:
+        raise SnapError(
+            "Unable to tell how batched {} of {} went: {}".format(
+                action, ", ".join(names), e.message
+            )
+        ) from e
+    except SnapError as e:
+        # only raised once the change is over, unlike a timeout
+        logger.debug(
+            "Batched {} of {} failed, retrying one at a time: {}".format(
+                action, ", ".join(names), e
+            )
+        )
+        return False
+    return True
+
+
 def _wrap_snap_operations(
     snap_names: List[str],
     state: SnapState,
@@ -854,18 +1713,35 @@ def _wrap_snap_operations(
     classic: bool,
     cohort: Optional[str] = "",
 ) -> Union[Snap, List[Snap]]:
-    """Wrap common operations for bare commands."""
+    """Wrap common operations for bare commands.
+
+    Without a channel, cohort or classic confinement, snaps needing the same action are
+    installed, refreshed or removed together in one snapd change. With the default `latest`
+    channel, which is what snapd installs without one, snaps are still installed together,
+    but refreshed one at a time as refreshing to `latest` switches their channel.
+    """
     snaps = {"success": [], "failed": []}
 
     op = "remove" if state is SnapState.Absent else "install or refresh"
 
+    batched = []
+    if state is SnapState.Absent or not (channel or cohort or classic):
+        batched = _ensure_batched(snap_names, state)
+    elif channel == "latest" and not (cohort or classic):
+        batched = _ensure_batched(snap_names, state, actions=("install",))
+
     for s in snap_names:
         try:
             snap = _Cache[s]
+            if s in batched:
+                snaps["success"].append(snap)
+                continue
             if state is SnapState.Absent:
                 snap.ensure(state=SnapState.Absent)
             else:
                 snap.ensure(state=state, classic=classic, channel=channel, cohort=cohort)
+                # pick up the revision and channel the snap now has
+                _refresh_cached(s)
             snaps["success"].append(snap)
         except SnapError as e:
             logger.warning("Failed to {} snap {}: {}!".format(op, s, e.message))
@@ -884,10 +1760,13 @@ def _wrap_snap_operations(
     return snaps["success"] if len(snaps["success"]) > 1 else snaps["success"][0]
 
 
+@_cache_init
 def install_local(
-    self, filename: str, classic: Optional[bool] = False, dangerous: Optional[bool] = False
+    filename: str, classic: Optional[bool] = False, dangerous: Optional[bool] = False
 ) -> Snap:
-    """Perform a snap operation.
+    """Install a local .snap file, streamed to snapd over its REST API.
+
+    Only the installed snap's entry in the snap cache is refreshed.
 
     Args:
         filename: the path to a local .snap file to install
@@ -897,22 +1776,30 @@ def install_local(
     Raises:
         SnapError if there is a problem encountered
     """
-    _cmd = [
-        "snap",
-        "install",
-        filename,
-        "--classic" if classic else "",
-        "--dangerous" if dangerous else "",
-    ]
+    client = _Cache.cache._snap_client
     try:
-        result = subprocess.check_output(_cmd, universal_newlines=True).splitlines()[0]
-        snap_name, _ = result.split(" ", 1)
-
-        c = SnapCache()
-
-        return c[snap_name]
-    except CalledProcessError as e:
-        raise SnapError("Could not install snap {}: {}".format(filename, e.output))
+        change = client.wait_for_change(client.sideload(filename, classic, dangerous))
+    except SnapAPIError as e:
+        raise SnapError(
+            "Could not install snap {}: {}".format(filename, e.body.get("message", e.message))
+        )
+    except (SnapError, OSError) as e:
+        raise SnapError("Could not install snap {}: {}".format(filename, e))
+
+    snap_name = change.get("data", {}).get("snap-name")
+    if not snap_name:
+        # older snapd only names the snap in the summary, e.g 'Install "jq" snap from file'
+        match = re.search(r'"([^"]+)" snap', change.get("summary", ""))
+        if not match:
+            raise SnapError("Could not tell which snap {} installed".format(filename))
+        snap_name = match.group(1)
+
+    snap = _refresh_cached(snap_name)
+    if snap is None:
+        raise SnapError(
+            "Installed snap {} from {}, but could not load it".format(snap_name, filename)
+        )
+    return snap
 
 
 def _system_set(config_item: str, value: str) -> None:
@@ -923,10 +1810,13 @@ def _system_set(config_item: str, value: str) -> None:
         value: value to assign
     """
     _cmd = ["snap", "set", "system", "{}={}".format(config_item, value)]
-    try:
-        subprocess.check_call(_cmd, universal_newlines=True)
-    except CalledProcessError:
-        raise SnapError("Failed setting system config '{}' to '{}'".format(config_item, value))
+    with _instrumented("subprocess", "snap set") as event:
+        try:
+            subprocess.check_call(_cmd, universal_newlines=True)
+        except CalledProcessError as e:
+            event["status"] = e.returncode
+            raise SnapError("Failed setting system config '{}' to '{}'".format(config_item, value))
+        event["status"] = 0
 
 
 def hold_refresh(days: int = 90) -> bool:
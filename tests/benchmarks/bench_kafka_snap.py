@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Measures the overhead KafkaSnap adds around kafka.* tools and snapd.
+
+Runs against fake `kafka.*` and `snap` executables on PATH and a fake snapd socket,
+so it needs neither snapd nor Kafka, and prints the results as JSON:
+
+    PYTHONPATH=lib python -m tests.benchmarks.bench_kafka_snap --output bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import stat
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from charms.kafka.v0 import kafka_snap
+from charms.operator_libs_linux.v1 import snap
+from tests.benchmarks.fake_snapd import KAFKA_SNAP, FakeSnapd
+
+FAKE_KAFKA_BIN = """#!/bin/sh
+head -c "${FAKE_KAFKA_OUTPUT_BYTES:-0}" /dev/zero | tr '\\0' 'x'
+"""
+FAKE_SNAP_BIN = """#!/bin/sh
+echo "kafka (rock/edge) 3.6.0 from Canonical installed"
+"""
+KAFKA_BINS = ["topics", "configs", "acls", "consumer-groups"]
+
+
+def _install_fakes(directory: str) -> None:
+    """Writes fake executables into a directory, and puts it first on PATH."""
+    scripts = {f"kafka.{name}": FAKE_KAFKA_BIN for name in KAFKA_BINS}
+    scripts["snap"] = FAKE_SNAP_BIN
+    for name, content in scripts.items():
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(content)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ['PATH']}"
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(operation: Callable[[], Any], iterations: int, concurrency: int) -> Dict[str, Any]:
+    """Times an operation, run `iterations` times by `concurrency` threads.
+
+    Allocations are traced in a separate, sequential run, as tracing slows every thread down.
+    """
+    operation()
+
+    def timed(_) -> float:
+        start = time.perf_counter()
+        operation()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(min(iterations, 20)):
+        operation()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput_per_s": iterations / elapsed,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000,
+            "p50": _percentile(latencies, 0.5) * 1000,
+            "p95": _percentile(latencies, 0.95) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "allocated_kib": {
+            "retained": (after - before) / 1024,
+            "peak": peak / 1024,
+        },
+    }
+
+
+def run(iterations: int, output_sizes: List[int], concurrency_levels: List[int]) -> Dict:
+    """Runs every benchmark, returning the results keyed by operation and parameters."""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory, FakeSnapd() as snapd:
+        _install_fakes(directory)
+        snap_bin = os.path.join(directory, "snap")
+        kafka_snap.SNAPD_SOCKET_PATH = snapd.socket_path
+        kafka_snap.SNAPD_BIN_PATH = snap_bin
+        # the Kafka `Snap` talks to snapd with a client of its own
+        snap.SNAPD_SOCKET_PATH = snapd.socket_path
+
+        for size in output_sizes:
+            os.environ["FAKE_KAFKA_OUTPUT_BYTES"] = str(size)
+            for concurrency in concurrency_levels:
+                results[f"run_bin_command[output={size},concurrency={concurrency}]"] = measure(
+                    lambda: kafka_snap.KafkaSnap.run_bin_command(
+                        "topics", ["--bootstrap-server=localhost:9092", "--describe"], []
+                    ),
+                    iterations,
+                    concurrency,
+                )
+
+        kafka = kafka_snap.KafkaSnap()
+        for action in kafka_snap.SERVICE_ACTIONS:
+            for concurrency in concurrency_levels:
+                results[f"service_action[{action},concurrency={concurrency}]"] = measure(
+                    lambda: kafka.service_action(action, "daemon", wait=True),
+                    iterations,
+                    concurrency,
+                )
+
+        def install_present() -> None:
+            kafka_snap.KafkaSnap().install()
+
+        def install_absent() -> None:
+            snapd.installed.pop("kafka", None)
+            try:
+                kafka_snap.KafkaSnap().install()
+            finally:
+                snapd.installed["kafka"] = KAFKA_SNAP
+
+        results["install[present]"] = measure(install_present, iterations, 1)
+        results["install[absent]"] = measure(install_absent, iterations, 1)
+        results["snapd_requests"] = len(snapd.requests)
+
+    return results
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--output-sizes", type=int, nargs="+", default=[0, 64 * 1024, 4 * 1024**2]
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if unset")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args.iterations, args.output_sizes, args.concurrency)
+
+    report = json.dumps(
+        {"python": sys.version.split()[0], "results": results}, indent=2, sort_keys=True
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Measures what SnapCache, Snap and SnapClient operations cost against a fake snapd.
+
+Serves `fixtures/snapd.json` from a fake snapd on a temporary socket, with each request
+delayed by a configurable latency, so it needs neither snapd nor network access, and
+prints the results as JSON:
+
+    PYTHONPATH=lib python -m tests.benchmarks.bench_snap --latency 0 0.002
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from charms.operator_libs_linux.v1 import snap
+from tests.benchmarks.bench_kafka_snap import measure
+from tests.benchmarks.fake_snapd import FakeSnapd
+
+SIDELOAD_BYTES = 32 * 1024**2
+
+
+def _point_at(snapd: FakeSnapd, directory: str) -> None:
+    """Points the snap lib at the fake snapd, and at files standing in for snapd's own."""
+    snap_bin = os.path.join(directory, "snap")
+    state = os.path.join(directory, "state.json")
+    for path in (snap_bin, state):
+        with open(path, "w") as f:
+            f.write("{}")
+
+    snap.SNAPD_SOCKET_PATH = snapd.socket_path
+    snap.SNAP_BIN_PATH = snap_bin
+    snap.SNAPD_STATE_PATH = state
+
+
+def run(
+    iterations: int, latencies: List[float], concurrency_levels: List[int], change_polls: int
+) -> Dict:
+    """Runs every benchmark, returning the results keyed by operation and parameters."""
+    results: Dict[str, Any] = {}
+    for latency in latencies:
+        fake = FakeSnapd.from_fixture(latency=latency, change_polls=change_polls)
+        with tempfile.TemporaryDirectory() as directory, fake as snapd:
+            _point_at(snapd, directory)
+            persist_path = os.path.join(directory, "snap-cache.json")
+            snap_file = os.path.join(directory, "jq_6.snap")
+            with open(snap_file, "wb") as f:
+                f.truncate(SIDELOAD_BYTES)
+            cache = snap.SnapCache()
+            kafka = cache["kafka"]
+            client = snap.SnapClient()
+
+            def lookup_available() -> None:
+                cache._snap_map.pop("yq", None)
+                cache["yq"]
+
+            def get_config() -> None:
+                # drop what earlier iterations cached, so each one asks snapd
+                kafka._config.clear()
+                kafka.get_many(["log-level"])
+
+            def sideload() -> None:
+                client.wait_for_change(client.sideload(snap_file, dangerous=True))
+
+            def restart() -> None:
+                client.wait_for_change(client.service_action("restart", ["kafka.daemon"]))
+
+            sequential = {
+                "SnapCache()": lambda: snap.SnapCache(),
+                "SnapCache(persist_path)": lambda: snap.SnapCache(persist_path=persist_path),
+                "SnapCache[installed]": lambda: cache["kafka"],
+                "SnapCache[available]": lookup_available,
+                "SnapCache.refresh": lambda: cache.refresh("kafka"),
+                "Snap.get_many": get_config,
+                "SnapClient.get_logs": lambda: list(client.get_logs(["kafka"], num_lines=None)),
+                "SnapClient.sideload": sideload,
+            }
+            for name, operation in sequential.items():
+                results[f"{name}[latency={latency}]"] = measure(operation, iterations, 1)
+
+            for concurrency in concurrency_levels:
+                for name, operation in {
+                    "Snap.services": lambda: kafka.services,
+                    "service restart": restart,
+                }.items():
+                    key = f"{name}[latency={latency},concurrency={concurrency}]"
+                    results[key] = measure(operation, iterations, concurrency)
+
+            results[f"snapd_requests[latency={latency}]"] = len(snapd.requests)
+
+    return results
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0, 0.002])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--change-polls", type=int, default=1, help="polls before a change is done"
+    )
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if unset")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run(args.iterations, args.latency, args.concurrency, args.change_polls)
+
+    report = json.dumps(
+        {"python": sys.version.split()[0], "results": results}, indent=2, sort_keys=True
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
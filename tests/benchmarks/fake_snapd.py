@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""A minimal stand-in for snapd's REST API, served on a temporary Unix socket.
+
+Snaps, configuration and log records come from fixture data, passed in directly or
+loaded from a JSON file such as `fixtures/snapd.json`:
+
+    with FakeSnapd.from_fixture(FIXTURE_PATH, latency=0.002) as snapd:
+        client = SnapClient(socket_path=snapd.socket_path)
+"""
+
+import json
+import os
+import re
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "snapd.json")
+
+KAFKA_SNAP = {
+    "name": "kafka",
+    "channel": "rock/edge",
+    "revision": "42",
+    "confinement": "strict",
+    "apps": [
+        {"snap": "kafka", "name": "daemon", "daemon": "simple", "enabled": True, "active": True},
+        {"snap": "kafka", "name": "topics"},
+    ],
+}
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, snapd: "FakeSnapd"):
+        super().__init__(socket_path, _Handler)
+        self.snapd = snapd
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+    # keeps connections open between requests, as snapd does
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self) -> str:
+        # Unix sockets have no peer address for the default access log
+        return "fake-snapd"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, document: Any) -> None:
+        if isinstance(document, bytes):
+            body, content_type = document, "application/json-seq"
+        else:
+            body, content_type = json.dumps(document).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_multipart(self, length: int) -> Dict[str, Any]:
+        """Reads a sideload upload in chunks, keeping its form fields and the upload's size."""
+        head = b""
+        remaining = length
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 1024**2))
+            remaining -= len(chunk)
+            if len(head) < 64 * 1024:
+                head += chunk
+
+        fields: Dict[str, Any] = {}
+        for part in head.split(b"\r\n--"):
+            headers, _, value = part.partition(b"\r\n\r\n")
+            name = re.search(rb'name="([^"]*)"', headers)
+            filename = re.search(rb'filename="([^"]*)"', headers)
+            if filename:
+                fields[name.group(1).decode()] = {
+                    "filename": filename.group(1).decode(),
+                    "upload_bytes": length,
+                }
+                break
+            elif name:
+                fields[name.group(1).decode()] = value.decode()
+        return fields
+
+    def _route(self, method: str) -> None:
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+            body = self._read_multipart(length)
+        else:
+            body = json.loads(self.rfile.read(length)) if length else None
+
+        snapd = self.server.snapd
+        with snapd.lock:
+            snapd.requests.append((method, url.path))
+        if snapd.latency:
+            time.sleep(snapd.latency)
+        status, document = snapd.handle(method, url.path, query, body)
+        self._reply(status, document)
+        if snapd.drop_connections:
+            # without a `Connection: close`, as snapd closing an idle connection looks
+            self.close_connection = True
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._route("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._route("POST")
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self._route("PUT")
+
+
+class FakeSnapd:
+    """Serves snapd's REST API for a fixed set of installed and available snaps.
+
+    Supports getting installed snaps, finding available snaps, sideloading snap files,
+    listing apps, getting and setting snap configuration, reading logs, snap and service
+    actions and polling the changes they create. Requests are answered with an error
+    instead once their method and path are added to `errors`, with the status to use.
+    Setting `drop_connections` closes every connection once its request is answered.
+
+    Args:
+        installed: snaps as `/v2/snaps` returns them. Defaults to `KAFKA_SNAP`
+        available: snaps as `/v2/find` returns them. Defaults to `KAFKA_SNAP`
+        config: snap name mapped to its configuration
+        logs: log records as `/v2/logs` returns them, oldest first
+        latency: seconds every request is delayed by before it is answered
+        change_polls: times a change is polled as `Doing` before it is `Done`
+    """
+
+    def __init__(
+        self,
+        installed: Optional[List[Dict[str, Any]]] = None,
+        available: Optional[List[Dict[str, Any]]] = None,
+        config: Optional[Dict[str, Dict[str, Any]]] = None,
+        logs: Optional[List[Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        change_polls: int = 0,
+    ):
+        self.installed = {snap["name"]: snap for snap in (installed or [KAFKA_SNAP])}
+        self.available = {snap["name"]: snap for snap in (available or [KAFKA_SNAP])}
+        self.config: Dict[str, Dict[str, Any]] = {
+            name: dict(values) for name, values in (config or {}).items()
+        }
+        self.logs = list(logs or [])
+        self.latency = latency
+        self.change_polls = change_polls
+        self.requests: List[tuple] = []
+        self.uploads: List[Dict[str, Any]] = []
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.drop_connections = False
+        self.lock = threading.Lock()
+        self._changes: Dict[str, Dict[str, Any]] = {}
+        self._polls_left: Dict[str, int] = {}
+        self._directory = tempfile.mkdtemp(prefix="fake-snapd-")
+        self.socket_path = os.path.join(self._directory, "snapd.socket")
+        self._server: Optional[_Server] = None
+
+    @classmethod
+    def from_fixture(cls, path: str = FIXTURE_PATH, **kwargs) -> "FakeSnapd":
+        """Builds a fake from a JSON file with `installed`, `available`, `config` and `logs`."""
+        with open(path) as f:
+            fixture = json.load(f)
+        for key in ("installed", "available", "config", "logs"):
+            kwargs.setdefault(key, fixture.get(key))
+        return cls(**kwargs)
+
+    def __enter__(self) -> "FakeSnapd":
+        """Starts serving in a background thread."""
+        self._server = _Server(self.socket_path, self)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stops serving and removes the socket."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        os.unlink(self.socket_path)
+        os.rmdir(self._directory)
+
+    @staticmethod
+    def _sync(result: Any) -> tuple:
+        return 200, {"type": "sync", "status-code": 200, "status": "OK", "result": result}
+
+    @staticmethod
+    def _error(status: int, message: str) -> tuple:
+        return status, {
+            "type": "error",
+            "status-code": status,
+            "status": "Error",
+            "result": {"message": message},
+        }
+
+    def _async(self, kind: str, data: Optional[Dict[str, Any]] = None) -> tuple:
+        change_id = str(len(self._changes) + 1)
+        self._changes[change_id] = {
+            "id": change_id,
+            "kind": kind,
+            "status": "Done",
+            "ready": True,
+            "data": data or {},
+        }
+        self._polls_left[change_id] = self.change_polls
+        return 202, {
+            "type": "async",
+            "status-code": 202,
+            "status": "Accepted",
+            "change": change_id,
+        }
+
+    def finish_change(
+        self, change_id: str, status: str = "Done", err: str = "", polls: int = 0
+    ) -> None:
+        """Makes a change end with `status` and `err`, once polled `polls` times more."""
+        with self.lock:
+            self._changes[change_id].update(status=status, ready=True)
+            if err:
+                self._changes[change_id]["err"] = err
+            self._polls_left[change_id] = polls
+
+    def _poll(self, change_id: str) -> Dict[str, Any]:
+        """Gets a change, which stays in progress for its first `change_polls` polls."""
+        if self._polls_left.get(change_id, 0) > 0:
+            self._polls_left[change_id] -= 1
+            return dict(self._changes[change_id], status="Doing", ready=False)
+        return self._changes[change_id]
+
+    def _logs(self, names: List[str], num_lines: int) -> bytes:
+        """Renders the matching log records as a JSON text sequence."""
+        records = [
+            record
+            for record in self.logs
+            if record.get("sid") in names or record.get("sid", "").split(".")[0] in names
+        ]
+        if num_lines >= 0:
+            records = records[max(0, len(records) - num_lines) :]
+        return b"".join(b"\x1e" + json.dumps(record).encode() + b"\n" for record in records)
+
+    def _get_snaps(self, query: Dict[str, str], body: Any) -> tuple:
+        return self._sync(list(self.installed.values()))
+
+    def _apply(self, action: str, name: str) -> None:
+        """Installs an available snap, or removes an installed one, as a change would."""
+        if action == "remove":
+            self.installed.pop(name, None)
+        elif action == "install" and name in self.available:
+            self.installed.setdefault(name, dict(self.available[name]))
+
+    def _post_snaps(self, query: Dict[str, str], body: Any) -> tuple:
+        if "snap" in body:
+            return self._sideload(body)
+        for name in body.get("snaps", []):
+            self._apply(body["action"], name)
+        return self._async(f"{body['action']}-snaps")
+
+    def _sideload(self, fields: Dict[str, Any]) -> tuple:
+        """Installs an uploaded snap, named after its file as in `<name>_<revision>.snap`."""
+        name = fields["snap"]["filename"].split("_")[0].removesuffix(".snap")
+        self.uploads.append(fields)
+        self.installed[name] = {
+            "name": name,
+            "channel": "",
+            "revision": "x1",
+            "confinement": "classic" if fields.get("classic") == "true" else "strict",
+            "apps": [],
+        }
+        return self._async("install-snap", {"snap-name": name})
+
+    def _get_snap(self, name: str, query: Dict[str, str], body: Any) -> tuple:
+        snap = self.installed.get(name)
+        return self._sync(snap) if snap else self._error(404, "snap not installed")
+
+    def _post_snap(self, name: str, query: Dict[str, str], body: Any) -> tuple:
+        self._apply(body["action"], name)
+        return self._async(f"{body['action']}-snap")
+
+    def _get_conf(self, name: str, query: Dict[str, str], body: Any) -> tuple:
+        config = self.config.setdefault(name, {})
+        keys = [key for key in query.get("keys", "").split(",") if key]
+        if any(key not in config for key in keys):
+            return self._error(400, "snap has no such configuration option")
+        return self._sync({key: config[key] for key in keys} if keys else config)
+
+    def _put_conf(self, name: str, query: Dict[str, str], body: Any) -> tuple:
+        config = self.config.setdefault(name, {})
+        for key, value in body.items():
+            if value is None:
+                config.pop(key, None)
+            else:
+                config[key] = value
+        return self._async("configure-snap")
+
+    def _find(self, query: Dict[str, str], body: Any) -> tuple:
+        snap = self.available.get(query.get("name", ""))
+        return self._sync([snap]) if snap else self._error(404, "snap not found")
+
+    def _get_apps(self, query: Dict[str, str], body: Any) -> tuple:
+        names = query.get("names", "").split(",")
+        apps = [
+            app
+            for snap in self.installed.values()
+            if snap["name"] in names
+            for app in snap.get("apps", [])
+            if query.get("select") != "service" or "daemon" in app
+        ]
+        return self._sync(apps)
+
+    def _post_apps(self, query: Dict[str, str], body: Any) -> tuple:
+        names = body.get("names", [])
+        for snap in self.installed.values():
+            for app in snap.get("apps", []):
+                if "daemon" in app and (
+                    snap["name"] in names or f"{snap['name']}.{app['name']}" in names
+                ):
+                    app["active"] = body["action"] != "stop"
+        return self._async(f"{body['action']}-snap-services")
+
+    def _get_logs(self, query: Dict[str, str], body: Any) -> tuple:
+        return 200, self._logs(query.get("names", "").split(","), int(query.get("n", 10)))
+
+    def _get_change(self, change_id: str, query: Dict[str, str], body: Any) -> tuple:
+        if change_id not in self._changes:
+            return self._error(404, f"cannot find change with id {change_id}")
+        return self._sync(self._poll(change_id))
+
+    ROUTES = [
+        ("GET", r"/v2/snaps", _get_snaps),
+        ("POST", r"/v2/snaps", _post_snaps),
+        ("GET", r"/v2/snaps/([^/]+)", _get_snap),
+        ("POST", r"/v2/snaps/([^/]+)", _post_snap),
+        ("GET", r"/v2/snaps/([^/]+)/conf", _get_conf),
+        ("PUT", r"/v2/snaps/([^/]+)/conf", _put_conf),
+        ("GET", r"/v2/find", _find),
+        ("GET", r"/v2/apps", _get_apps),
+        ("POST", r"/v2/apps", _post_apps),
+        ("GET", r"/v2/logs", _get_logs),
+        ("GET", r"/v2/changes/([^/]+)", _get_change),
+    ]
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, str], body: Optional[Dict[str, Any]]
+    ) -> tuple:
+        """Answers one request, returning the HTTP status and response document."""
+        with self.lock:
+            if (method, path) in self.errors:
+                return self._error(self.errors[(method, path)], f"failing {method} {path}")
+            for route_method, pattern, handler in self.ROUTES:
+                match = re.fullmatch(pattern, path)
+                if match and method == route_method:
+                    return handler(self, *match.groups(), query, body)
+
+            return self._error(404, f"no fake for {method} {path}")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import os
+
+import pytest
+from charms.kafka.v0 import kafka_snap
+from charms.operator_libs_linux.v1 import snap
+from tests.benchmarks.fake_snapd import FakeSnapd
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_PATH, name)) as f:
+        return f.read()
+
+
+@pytest.fixture
+def snapd(tmp_path, monkeypatch):
+    """A fake snapd serving `tests/benchmarks/fixtures/snapd.json`, used by KafkaSnap."""
+    snapd_bin = tmp_path / "snapd"
+    snapd_bin.write_text("")
+    with FakeSnapd.from_fixture() as snapd:
+        monkeypatch.setattr(kafka_snap, "SNAPD_SOCKET_PATH", snapd.socket_path)
+        monkeypatch.setattr(kafka_snap, "SNAPD_BIN_PATH", str(snapd_bin))
+        # the Kafka `Snap` talks to snapd with a client of its own
+        monkeypatch.setattr(snap, "SNAPD_SOCKET_PATH", snapd.socket_path)
+        yield snapd
+
+
+@pytest.fixture
+def snap_lib_snapd(tmp_path, monkeypatch):
+    """A fake snapd the snap lib talks to, with a fresh global snap cache."""
+    snap_bin, state, names = tmp_path / "snap", tmp_path / "state.json", tmp_path / "names"
+    snap_bin.write_text("")
+    state.write_text("{}")
+    with FakeSnapd.from_fixture() as snapd:
+        names.write_text("".join(name + "\n" for name in snapd.available))
+        monkeypatch.setattr(snap, "SNAPD_SOCKET_PATH", snapd.socket_path)
+        monkeypatch.setattr(snap, "SNAP_BIN_PATH", str(snap_bin))
+        monkeypatch.setattr(snap, "SNAPD_STATE_PATH", str(state))
+        monkeypatch.setattr(snap, "SNAPD_NAMES_PATH", str(names))
+        snap._Cache.cache = None
+        yield snapd
+        snap._Cache.cache = None
+
+
+@pytest.fixture
+def topics_describe() -> str:
+    """`kafka.topics --describe` output."""
+    return _read_fixture("topics_describe.txt")
+
+
+@pytest.fixture
+def acls_list() -> str:
+    """`kafka.acls --list` output."""
+    return _read_fixture("acls_list.txt")
+
+
+@pytest.fixture
+def topic_configs() -> str:
+    """`kafka.configs --entity-type topics --describe --all` output."""
+    return _read_fixture("topic_configs.txt")
+
+
+@pytest.fixture
+def consumer_groups_describe() -> str:
+    """`kafka.consumer-groups --describe` output, for two groups."""
+    return _read_fixture("consumer_groups_describe.txt")
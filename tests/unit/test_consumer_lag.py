@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import math
+
+import pytest
+from charms.kafka.v0.consumer_lag import (
+    ConsumerLagSampler,
+    LagBuffer,
+    parse_consumer_groups_describe,
+)
+
+
+class FakeKafkaSnap:
+    """Answers `run_bin_command` with fixed output, recording the calls."""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.calls = []
+
+    def run_bin_command(self, bin_keyword, bin_args, opts, lightweight_jvm=False):
+        self.calls.append((bin_keyword, bin_args, opts, lightweight_jvm))
+        return self.output
+
+
+def test_parse_consumer_groups_describe(consumer_groups_describe):
+    groups = parse_consumer_groups_describe(consumer_groups_describe)
+
+    # partition 2 has no committed offset yet
+    assert groups == {
+        "billing": {("orders", 0): 120, ("orders", 1): 30},
+        "idle": {("audit", 0): 0},
+    }
+
+
+def test_lag_buffer_keeps_the_latest_samples():
+    buffer = LagBuffer(capacity=3)
+    for second in range(5):
+        buffer.append(float(second), float(10 * second))
+
+    timestamps, lags = buffer.samples()
+
+    assert len(buffer) == 3
+    assert list(timestamps) == [2.0, 3.0, 4.0]
+    assert list(lags) == [20.0, 30.0, 40.0]
+    assert buffer.latest == 40.0
+
+
+def test_lag_buffer_rejects_capacity_below_two():
+    with pytest.raises(ValueError):
+        LagBuffer(capacity=1)
+
+
+def test_lag_buffer_growth_rate_and_time_to_drain():
+    buffer = LagBuffer(capacity=10)
+    assert buffer.latest is None
+    assert buffer.growth_rate() is None
+    assert buffer.time_to_drain() is None
+
+    buffer.append(1_700_000_000.0, 1000.0)
+    assert buffer.growth_rate() is None
+    assert buffer.time_to_drain() is None
+
+    for second in range(1, 5):
+        buffer.append(1_700_000_000.0 + second, 1000.0 - 100 * second)
+
+    assert buffer.growth_rate() == pytest.approx(-100.0)
+    assert buffer.time_to_drain() == pytest.approx(6.0)
+
+
+def test_lag_buffer_time_to_drain_when_not_shrinking():
+    buffer = LagBuffer(capacity=10)
+    buffer.append(0.0, 5.0)
+    buffer.append(1.0, 5.0)
+    assert buffer.time_to_drain() == math.inf
+
+    buffer.append(2.0, 0.0)
+    assert buffer.time_to_drain() == 0.0
+
+
+def test_sampler_samples_all_groups_at_once(consumer_groups_describe):
+    snap = FakeKafkaSnap(consumer_groups_describe)
+    seen = []
+    sampler = ConsumerLagSampler(
+        snap=snap,
+        groups=["idle", "billing", "missing"],
+        bootstrap_server="localhost:9092",
+        command_config="/var/snap/kafka/common/client.properties",
+        callback=seen.append,
+    )
+
+    totals = sampler.sample()
+
+    assert totals == {"billing": 150, "idle": 0}
+    ((bin_keyword, bin_args, opts, lightweight_jvm),) = snap.calls
+    assert bin_keyword == "consumer-groups"
+    assert sorted(bin_args) == [
+        "--bootstrap-server=localhost:9092",
+        "--command-config=/var/snap/kafka/common/client.properties",
+        "--describe",
+        "--group=billing",
+        "--group=idle",
+        "--group=missing",
+    ]
+    assert opts == []
+    assert lightweight_jvm
+    assert seen[0]["billing"]["lag"] == 150
+    assert seen[0]["missing"] == {"lag": None, "growth_rate": None, "time_to_drain": None}
+
+
+def test_sampler_prometheus(consumer_groups_describe):
+    sampler = ConsumerLagSampler(
+        snap=FakeKafkaSnap(consumer_groups_describe),
+        groups=["billing", "idle"],
+        bootstrap_server="localhost:9092",
+    )
+    sampler.sample()
+
+    lines = sampler.prometheus().splitlines()
+
+    assert "# TYPE kafka_consumer_group_lag gauge" in lines
+    assert 'kafka_consumer_group_lag{group="billing"} 150.0' in lines
+    assert 'kafka_consumer_group_time_to_drain_seconds{group="idle"} 0.0' in lines
+    # a single sample gives no rate yet
+    assert not any(line.startswith("kafka_consumer_group_lag_growth_rate{") for line in lines)
+
+
+def test_sampler_prometheus_escapes_group_ids():
+    group = 'say "hi"\\now\n'
+    sampler = ConsumerLagSampler(
+        snap=FakeKafkaSnap(""), groups=[group], bootstrap_server="localhost:9092"
+    )
+    sampler.buffers[group].append(0.0, 7.0)
+
+    lines = sampler.prometheus().splitlines()
+
+    assert 'kafka_consumer_group_lag{group="say \\"hi\\"\\\\now\\n"} 7.0' in lines
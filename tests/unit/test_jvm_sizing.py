@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import pytest
+from charms.kafka.v0 import jvm_sizing
+from charms.kafka.v0.jvm_sizing import (
+    GiB,
+    MiB,
+    cpu_count,
+    memory_limit,
+    recommend_jvm_settings,
+)
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Points the cgroup files at a temporary directory, returning a writer for them."""
+    paths = {}
+    for name in (
+        "CGROUP_V2_MEMORY_MAX",
+        "CGROUP_V1_MEMORY_LIMIT",
+        "CGROUP_V2_CPU_MAX",
+        "CGROUP_V1_CPU_QUOTA",
+        "CGROUP_V1_CPU_PERIOD",
+    ):
+        paths[name] = tmp_path / name
+        monkeypatch.setattr(jvm_sizing, name, str(paths[name]))
+    monkeypatch.setattr(jvm_sizing.os, "sched_getaffinity", lambda pid: set(range(8)))
+
+    def write(name: str, content: str) -> None:
+        paths[name].write_text(content)
+
+    return write
+
+
+def test_memory_limit_from_cgroup_v2(cgroup):
+    cgroup("CGROUP_V2_MEMORY_MAX", f"{4 * GiB}\n")
+    cgroup("CGROUP_V1_MEMORY_LIMIT", f"{8 * GiB}\n")
+
+    assert memory_limit() == 4 * GiB
+
+
+def test_memory_limit_from_cgroup_v1(cgroup):
+    cgroup("CGROUP_V2_MEMORY_MAX", "max\n")
+    cgroup("CGROUP_V1_MEMORY_LIMIT", f"{2 * GiB}\n")
+
+    assert memory_limit() == 2 * GiB
+
+
+def test_memory_limit_falls_back_to_host_memory(cgroup):
+    # cgroup v1 reports no limit as a huge page-aligned value
+    cgroup("CGROUP_V1_MEMORY_LIMIT", "9223372036854771712\n")
+    host = jvm_sizing.os.sysconf("SC_PAGE_SIZE") * jvm_sizing.os.sysconf("SC_PHYS_PAGES")
+
+    assert memory_limit() == host
+
+
+@pytest.mark.parametrize(
+    "files, cpus",
+    [
+        ({"CGROUP_V2_CPU_MAX": "250000 100000\n"}, 3),
+        ({"CGROUP_V2_CPU_MAX": "max 100000\n"}, 8),
+        ({"CGROUP_V1_CPU_QUOTA": "200000\n", "CGROUP_V1_CPU_PERIOD": "100000\n"}, 2),
+        ({"CGROUP_V1_CPU_QUOTA": "-1\n", "CGROUP_V1_CPU_PERIOD": "100000\n"}, 8),
+        # a quota above the CPUs the process may run on does not add any
+        ({"CGROUP_V2_CPU_MAX": "1600000 100000\n"}, 8),
+        ({}, 8),
+    ],
+)
+def test_cpu_count(cgroup, files, cpus):
+    for name, content in files.items():
+        cgroup(name, content)
+
+    assert cpu_count() == cpus
+
+
+def test_recommend_jvm_settings_for_a_broker():
+    settings = recommend_jvm_settings("broker", memory=16 * GiB, cpus=8)
+
+    # a quarter of the memory, leaving the rest to the page cache
+    assert settings["heap_size"] == 4 * GiB
+    assert settings["KAFKA_HEAP_OPTS"] == "-Xms4096m -Xmx4096m"
+    assert settings["page_cache_headroom"] == 12 * GiB - 512 * MiB
+    gc_opts = settings["KAFKA_JVM_PERFORMANCE_OPTS"].split()
+    assert "-XX:+UseG1GC" in gc_opts
+    assert "-XX:ParallelGCThreads=8" in gc_opts
+    assert "-XX:ConcGCThreads=2" in gc_opts
+
+
+@pytest.mark.parametrize(
+    "role, memory, heap_size",
+    [
+        # clamped to each role's maximum
+        ("broker", 64 * GiB, 6 * GiB),
+        ("controller", 64 * GiB, 2 * GiB),
+        ("zookeeper", 64 * GiB, 4 * GiB),
+        # and minimum
+        ("broker", GiB, 512 * MiB),
+        ("zookeeper", 2 * GiB, GiB),
+        # unless the minimum would not leave room for anything else
+        ("broker", 768 * MiB, 384 * MiB),
+    ],
+)
+def test_recommend_jvm_settings_heap_bounds(role, memory, heap_size):
+    settings = recommend_jvm_settings(role, memory=memory, cpus=1)
+
+    assert settings["heap_size"] == heap_size
+    assert settings["heap_size"] % MiB == 0
+    assert "-XX:ConcGCThreads=1" in settings["KAFKA_JVM_PERFORMANCE_OPTS"].split()
+
+
+def test_recommend_jvm_settings_detects_the_unit(cgroup):
+    cgroup("CGROUP_V2_MEMORY_MAX", f"{8 * GiB}\n")
+    cgroup("CGROUP_V2_CPU_MAX", "400000 100000\n")
+
+    settings = recommend_jvm_settings("broker")
+
+    assert settings["heap_size"] == 2 * GiB
+    assert "-XX:ParallelGCThreads=4" in settings["KAFKA_JVM_PERFORMANCE_OPTS"].split()
+
+
+def test_recommend_jvm_settings_rejects_unknown_roles():
+    with pytest.raises(ValueError):
+        recommend_jvm_settings("connect", memory=GiB, cpus=1)
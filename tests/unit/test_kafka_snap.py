@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import json
+import os
+
+import pytest
+from charms.kafka.v0 import kafka_snap
+from charms.kafka.v0.kafka_snap import (
+    ADMIN_TOOL_HEAP_OPTS,
+    AclBinding,
+    KafkaSnap,
+    _group_acl_bindings,
+    leader_skew,
+    parse_acls_list,
+    parse_topic_configs,
+    parse_topics_describe,
+)
+from charms.operator_libs_linux.v1 import snap
+
+
+class RecordingKafkaSnap(KafkaSnap):
+    """Answers admin tool invocations with fixed output, recording them."""
+
+    def __init__(self, outputs):
+        super().__init__()
+        self.outputs = outputs
+        self.calls = []
+
+    def run_bin_command(self, bin_keyword, bin_args, opts, lightweight_jvm=False):
+        self.calls.append((bin_keyword, bin_args, opts, lightweight_jvm))
+        return self.outputs.get(bin_keyword, "")
+
+
+def test_kafka_snap_is_looked_up_in_the_store_when_not_installed(snapd):
+    del snapd.installed["kafka"]
+
+    kafka = KafkaSnap().kafka
+
+    assert kafka.state is snap.SnapState.Available
+    assert ("GET", "/v2/find") in snapd.requests
+
+
+def test_kafka_snap_is_not_looked_up_in_the_store_when_snapd_fails(snapd):
+    snapd.errors[("GET", "/v2/snaps/kafka")] = 500
+
+    with pytest.raises(snap.SnapAPIError) as e:
+        KafkaSnap().kafka
+
+    assert e.value.code == 500
+    assert ("GET", "/v2/find") not in snapd.requests
+
+
+def test_kafka_snap_lookup_fails_when_snapd_is_unreachable(snapd, tmp_path, monkeypatch):
+    monkeypatch.setattr(kafka_snap, "SNAPD_SOCKET_PATH", str(tmp_path / "missing.socket"))
+
+    with pytest.raises(snap.SnapAPIError):
+        KafkaSnap().kafka
+
+
+def test_install_does_not_reinstall_when_snapd_fails(snapd, monkeypatch):
+    snapd.errors[("GET", "/v2/snaps/kafka")] = 500
+    commands = []
+    monkeypatch.setattr(snap.subprocess, "check_output", lambda cmd, **_: commands.append(cmd))
+
+    assert not KafkaSnap().install()
+    assert commands == []
+
+
+@pytest.fixture
+def apt_calls(monkeypatch):
+    """The apt calls made while the test runs, none of which touch the system."""
+    calls = []
+    monkeypatch.setattr(kafka_snap.apt, "update", lambda: calls.append(("update",)))
+    monkeypatch.setattr(
+        kafka_snap.apt, "add_package", lambda package: calls.append(("add_package", package))
+    )
+    return calls
+
+
+def test_install_skips_apt_and_snap_when_already_installed(snapd, apt_calls, monkeypatch):
+    commands = []
+    monkeypatch.setattr(snap.subprocess, "check_output", lambda cmd, **_: commands.append(cmd))
+    kafka = KafkaSnap()
+
+    assert kafka.install()
+
+    assert apt_calls == []
+    assert commands == []
+    assert set(kafka.install_timings) == {"check-snapd", "check-snap"}
+    assert [path for _, path in snapd.requests] == ["/v2/snaps/kafka"]
+
+
+def test_install_bootstraps_snapd_through_apt_when_missing(snapd, apt_calls, monkeypatch):
+    monkeypatch.setattr(kafka_snap, "SNAPD_BIN_PATH", "/nonexistent/snap")
+
+    # snapd is still missing after the patched apt calls
+    assert not KafkaSnap().install()
+
+    assert apt_calls == [("update",), ("add_package", "snapd")]
+
+
+@pytest.fixture
+def config_snap(tmp_path):
+    """A `KafkaSnap` rendering its config files under a temporary directory."""
+    kafka = KafkaSnap()
+    kafka.snap_config_path = str(tmp_path)
+    return kafka
+
+
+def test_render_config_files_skips_unchanged_files(config_snap, tmp_path):
+    configs = {"server.properties": "broker.id=0\n", "client.properties": "a=b\n"}
+    assert sorted(config_snap.render_config_files(configs)["changed"]) == [
+        "client.properties",
+        "server.properties",
+    ]
+    before = os.stat(tmp_path / "server.properties")
+
+    result = config_snap.render_config_files(configs)
+
+    assert result == {"changed": [], "restart_required": False, "dynamic_configs": {}}
+    after = os.stat(tmp_path / "server.properties")
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+
+
+def test_render_config_files_replaces_changed_files(config_snap, tmp_path):
+    path = tmp_path / "server.properties"
+    config_snap.render_config_files({"server.properties": "broker.id=0\n"})
+    os.chmod(path, 0o640)
+    inode = os.stat(path).st_ino
+
+    result = config_snap.render_config_files({"server.properties": "broker.id=1\n"})
+
+    assert result["changed"] == ["server.properties"]
+    assert path.read_text() == "broker.id=1\n"
+    # renamed over the old file, keeping its mode, with no temporary file left behind
+    assert os.stat(path).st_ino != inode
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert sorted(os.listdir(tmp_path)) == [".config-manifest.json", "server.properties"]
+
+
+def test_render_config_files_rewrites_files_edited_elsewhere(config_snap, tmp_path):
+    config_snap.render_config_files({"client.properties": "a=b\n"})
+    (tmp_path / "client.properties").write_text("a=edited\n")
+
+    result = config_snap.render_config_files({"client.properties": "a=b\n"})
+
+    assert result["changed"] == ["client.properties"]
+    assert (tmp_path / "client.properties").read_text() == "a=b\n"
+
+
+def test_render_config_files_reports_what_changed(config_snap):
+    config_snap.render_config_files(
+        {
+            "server.properties": "broker.id=0\nlog.retention.ms=1000\n",
+            "client.properties": "a=b\n",
+            "zookeeper.properties": "tickTime=2000\n",
+        }
+    )
+
+    # dynamic broker configs and client properties need no restart
+    result = config_snap.render_config_files(
+        {
+            "server.properties": "broker.id=0\nlog.retention.ms=2000\n",
+            "client.properties": "a=c\n",
+            "zookeeper.properties": "tickTime=2000\n",
+        }
+    )
+    assert sorted(result["changed"]) == ["client.properties", "server.properties"]
+    assert not result["restart_required"]
+    assert result["dynamic_configs"] == {"log.retention.ms": "2000"}
+
+    result = config_snap.render_config_files(
+        {"server.properties": "broker.id=1\nlog.retention.ms=3000\n"}
+    )
+    assert result == {
+        "changed": ["server.properties"],
+        "restart_required": True,
+        "dynamic_configs": {},
+    }
+
+
+def test_render_config_files_creates_directories(config_snap, tmp_path):
+    result = config_snap.render_config_files({"certs/ca.pem": "ca\n"})
+
+    assert result["changed"] == ["certs/ca.pem"]
+    assert (tmp_path / "certs" / "ca.pem").read_text() == "ca\n"
+
+
+def test_follow_logs_without_idle_timeout(snapd):
+    messages = list(KafkaSnap().follow_logs("daemon"))
+
+    daemon_logs = [record["message"] for record in snapd.logs if record["sid"] == "kafka.daemon"]
+    assert messages == daemon_logs[-10:]
+
+
+def test_follow_logs_filters_on_pattern(snapd):
+    messages = list(KafkaSnap().follow_logs("daemon", pattern=r"line \d*7$", num_lines=None))
+
+    assert messages == [
+        record["message"]
+        for record in snapd.logs
+        if record["sid"] == "kafka.daemon" and record["message"].endswith("7")
+    ]
+    assert messages
+
+
+def test_service_action_refreshes_kafka_services(snapd):
+    kafka = KafkaSnap()
+    assert kafka.kafka.services["daemon"]["active"]
+
+    kafka.service_action("stop", "daemon", wait=True)
+    assert not kafka.kafka.services["daemon"]["active"]
+
+    kafka.service_action("start", "daemon", wait=True)
+    assert kafka.kafka.services["daemon"]["active"]
+
+
+def test_health_checks_use_lightweight_jvm(topics_describe):
+    snap = RecordingKafkaSnap(
+        {
+            "broker-api-versions": "kafka-0:9092 (id: 0 rack: az0) -> (\n)\n",
+            "topics": topics_describe,
+        }
+    )
+
+    assert snap.registered_brokers("localhost:9092", command_config="client.properties") == {0}
+    assert len(snap.under_replicated_partitions("localhost:9092")) == 4
+
+    assert [call[0] for call in snap.calls] == ["broker-api-versions", "topics"]
+    assert snap.calls[0][1] == [
+        "--bootstrap-server=localhost:9092",
+        "--command-config=client.properties",
+    ]
+    assert all(opts == [] and lightweight_jvm for _, _, opts, lightweight_jvm in snap.calls)
+
+
+def test_admin_tool_heap_is_fixed():
+    heap = {opt[:4]: opt[4:] for opt in ADMIN_TOOL_HEAP_OPTS.split()}
+
+    assert heap["-Xms"] == heap["-Xmx"]
+
+
+def test_parse_acls_list(acls_list):
+    bindings = parse_acls_list(acls_list)
+
+    # entries denying, or for a given host, are not managed
+    assert bindings == {
+        AclBinding("User:billing", "TOPIC", "orders", "READ"),
+        AclBinding("User:billing", "TOPIC", "orders", "DESCRIBE"),
+        AclBinding("User:billing", "GROUP", "billing-", "READ", "PREFIXED"),
+        AclBinding("User:admin", "CLUSTER", "kafka-cluster", "ALTER_CONFIGS"),
+    }
+
+
+def test_acl_binding_normalized():
+    binding = AclBinding("User:a", "transactional-id", "tx", "describeConfigs", "prefixed")
+
+    assert binding.normalized() == AclBinding(
+        "User:a", "TRANSACTIONAL_ID", "tx", "DESCRIBECONFIGS", "PREFIXED"
+    )
+
+
+def test_group_acl_bindings():
+    bindings = [
+        AclBinding(principal, "TOPIC", topic, operation)
+        for principal in ("User:a", "User:b")
+        for topic in ("orders", "audit")
+        for operation in ("READ", "DESCRIBE")
+    ]
+    bindings += [
+        # a different operation needs a call of its own
+        AclBinding("User:c", "TOPIC", "orders", "WRITE"),
+        # and so does a different pattern type
+        AclBinding("User:a", "GROUP", "billing-", "READ", "PREFIXED"),
+    ]
+
+    groups = _group_acl_bindings(bindings)
+
+    assert len(groups) == 3
+    assert set(groups) == {
+        (
+            "LITERAL",
+            frozenset({"User:a", "User:b"}),
+            frozenset({"READ", "DESCRIBE"}),
+            frozenset({("TOPIC", "orders"), ("TOPIC", "audit")}),
+        ),
+        (
+            "LITERAL",
+            frozenset({"User:c"}),
+            frozenset({"WRITE"}),
+            frozenset({("TOPIC", "orders")}),
+        ),
+        (
+            "PREFIXED",
+            frozenset({"User:a"}),
+            frozenset({"READ"}),
+            frozenset({("GROUP", "billing-")}),
+        ),
+    }
+
+
+def test_group_acl_bindings_covers_every_binding():
+    bindings = {
+        AclBinding(f"User:{principal}", "TOPIC", topic, operation)
+        for principal, topic, operation in [
+            ("a", "orders", "READ"),
+            ("a", "orders", "WRITE"),
+            ("a", "audit", "READ"),
+            ("b", "orders", "READ"),
+            ("b", "audit", "DESCRIBE"),
+        ]
+    }
+
+    covered = {
+        AclBinding(principal, resource_type, resource_name, operation, pattern_type)
+        for pattern_type, principals, operations, resources in _group_acl_bindings(bindings)
+        for principal in principals
+        for operation in operations
+        for resource_type, resource_name in resources
+    }
+
+    assert covered == bindings
+
+
+def test_apply_acls_lists_once_and_groups_changes(acls_list):
+    kafka = RecordingKafkaSnap({"acls": acls_list})
+    desired = [
+        # already there, once normalized
+        AclBinding("User:billing", "topic", "orders", "read"),
+        AclBinding("User:admin", "CLUSTER", "kafka-cluster", "ALTER_CONFIGS"),
+        # missing, and added in a single call
+        *(
+            AclBinding(principal, "TOPIC", topic, "WRITE")
+            for principal in ("User:billing", "User:shipping")
+            for topic in ("orders", "audit")
+        ),
+    ]
+
+    result = kafka.apply_acls(desired, "localhost:9092", command_config="client.properties")
+
+    base = ["--bootstrap-server=localhost:9092", "--command-config=client.properties"]
+    assert [args for _, args, _, _ in kafka.calls] == [
+        [*base, "--list"],
+        [
+            *base,
+            "--remove",
+            "--resource-pattern-type=LITERAL",
+            "--force",
+            "--allow-principal=User:billing",
+            "--operation=Describe",
+            "--topic=orders",
+        ],
+        [
+            *base,
+            "--remove",
+            "--resource-pattern-type=PREFIXED",
+            "--force",
+            "--allow-principal=User:billing",
+            "--operation=Read",
+            "--group=billing-",
+        ],
+        [
+            *base,
+            "--add",
+            "--resource-pattern-type=LITERAL",
+            "--allow-principal=User:billing",
+            "--allow-principal=User:shipping",
+            "--operation=Write",
+            "--topic=audit",
+            "--topic=orders",
+        ],
+    ]
+    assert all(
+        keyword == "acls" and opts == [] and lightweight_jvm
+        for keyword, _, opts, lightweight_jvm in kafka.calls
+    )
+    assert result["invocations"] == 3
+    assert len(result["added"]) == 4
+    assert result["removed"] == [
+        AclBinding("User:billing", "GROUP", "billing-", "READ", "PREFIXED"),
+        AclBinding("User:billing", "TOPIC", "orders", "DESCRIBE"),
+    ]
+
+
+def test_apply_acls_only_removes_acls_of_managed_principals(acls_list):
+    kafka = RecordingKafkaSnap({"acls": acls_list})
+
+    result = kafka.apply_acls([], "localhost:9092", principals=["User:admin"])
+
+    assert [args for _, args, _, _ in kafka.calls] == [
+        ["--bootstrap-server=localhost:9092", "--list"],
+        [
+            "--bootstrap-server=localhost:9092",
+            "--remove",
+            "--resource-pattern-type=LITERAL",
+            "--force",
+            "--allow-principal=User:admin",
+            "--operation=AlterConfigs",
+            # the cluster takes no name
+            "--cluster",
+        ],
+    ]
+    assert result == {
+        "added": [],
+        "removed": [AclBinding("User:admin", "CLUSTER", "kafka-cluster", "ALTER_CONFIGS")],
+        "invocations": 1,
+    }
+
+
+def test_apply_acls_does_nothing_when_current(acls_list):
+    kafka = RecordingKafkaSnap({"acls": acls_list})
+
+    result = kafka.apply_acls(parse_acls_list(acls_list), "localhost:9092")
+
+    assert len(kafka.calls) == 1
+    assert result == {"added": [], "removed": [], "invocations": 0}
+
+
+@pytest.mark.parametrize("lightweight_jvm", [False, True])
+def test_run_bin_command_environment(monkeypatch, lightweight_jvm):
+    commands = []
+    monkeypatch.setattr(
+        kafka_snap.subprocess, "check_output", lambda command, **_: commands.append(command)
+    )
+
+    KafkaSnap.run_bin_command(
+        "acls", ["--list"], ["-Djava.security.auth.login.config=/a"], lightweight_jvm
+    )
+
+    command = "KAFKA_OPTS=-Djava.security.auth.login.config=/a kafka.acls --list"
+    if lightweight_jvm:
+        command = (
+            "KAFKA_HEAP_OPTS='-Xms256m -Xmx256m' "
+            "KAFKA_JVM_PERFORMANCE_OPTS='-XX:+UseSerialGC -XX:TieredStopAtLevel=1 -Xshare:auto' "
+            f"{command}"
+        )
+    assert commands == [command]
+
+
+def test_parse_topic_configs(topic_configs):
+    topics = parse_topic_configs(topic_configs)
+
+    assert topics["orders"] == {
+        "cleanup.policy": {"value": "compact,delete", "source": "DYNAMIC_TOPIC_CONFIG"},
+        "retention.ms": {"value": "86400000", "source": "DYNAMIC_TOPIC_CONFIG"},
+        "min.insync.replicas": {"value": "1", "source": "DEFAULT_CONFIG"},
+        "message.downconversion.enable": {"value": "true", "source": ""},
+    }
+    assert topics["audit"] == {"retention.ms": {"value": "604800000", "source": "DEFAULT_CONFIG"}}
+
+
+def test_apply_topic_configs_alters_only_differing_topics(topic_configs):
+    kafka = RecordingKafkaSnap({"configs": topic_configs})
+    spec = {
+        "orders": {
+            # unchanged
+            "retention.ms": "86400000",
+            # back to the broker default
+            "cleanup.policy": None,
+            # already the default, so there is no override to remove
+            "min.insync.replicas": None,
+            "max.message.bytes": 2097152,
+            "follower.replication.throttled.replicas": "0:1,1:2",
+        },
+        "audit": {"retention.ms": 604800000},
+        "missing": {"retention.ms": "1"},
+    }
+
+    changes = kafka.apply_topic_configs(spec, "localhost:9092", max_workers=2)
+
+    assert changes == {
+        "orders": {
+            "set": {
+                "max.message.bytes": "2097152",
+                "follower.replication.throttled.replicas": "0:1,1:2",
+            },
+            "deleted": ["cleanup.policy"],
+            "error": None,
+        }
+    }
+    describe, alter = kafka.calls
+    assert describe[1] == [
+        "--bootstrap-server=localhost:9092",
+        "--entity-type=topics",
+        "--describe",
+        "--all",
+    ]
+    assert alter[1] == [
+        "--bootstrap-server=localhost:9092",
+        "--entity-type=topics",
+        "--entity-name=orders",
+        "--alter",
+        # list values are bracketed
+        "--add-config='follower.replication.throttled.replicas=[0:1,1:2],"
+        "max.message.bytes=2097152'",
+        "--delete-config=cleanup.policy",
+    ]
+    assert all(lightweight_jvm for _, _, _, lightweight_jvm in kafka.calls)
+
+
+def test_parse_topics_describe(topics_describe):
+    partitions = parse_topics_describe(topics_describe)
+
+    assert partitions == [
+        {"topic": "orders", "partition": 0, "leader": 1, "replicas": [1, 2, 3], "isr": [1, 2, 3]},
+        {"topic": "orders", "partition": 1, "leader": 3, "replicas": [2, 3, 1], "isr": [3, 1, 2]},
+        {"topic": "orders", "partition": 2, "leader": -1, "replicas": [3, 1, 2], "isr": []},
+        {"topic": "audit", "partition": 0, "leader": 2, "replicas": [1, 2], "isr": [2]},
+    ]
+
+
+def test_leader_skew(topics_describe):
+    skew = leader_skew(parse_topics_describe(topics_describe))
+
+    assert skew[1] == {"preferred": 2, "leading": 1, "imbalance": 0.5}
+    assert skew[2] == {"preferred": 1, "leading": 1, "imbalance": 1.0}
+    assert skew[3] == {"preferred": 1, "leading": 1, "imbalance": 1.0}
+
+
+class ElectionRecordingKafkaSnap(RecordingKafkaSnap):
+    """Also records the partitions each `kafka.leader-election` call was given."""
+
+    def __init__(self, outputs, snap_config_path):
+        super().__init__(outputs)
+        self.snap_config_path = snap_config_path
+        self.elections = []
+
+    def run_bin_command(self, bin_keyword, bin_args, opts, lightweight_jvm=False):
+        if bin_keyword == "leader-election":
+            (path,) = [arg.split("=", 1)[1] for arg in bin_args if "--path-to-json-file" in arg]
+            with open(path) as f:
+                self.elections.append(json.load(f)["partitions"])
+        return super().run_bin_command(bin_keyword, bin_args, opts, lightweight_jvm)
+
+
+def test_elect_preferred_leaders(topics_describe, tmp_path):
+    kafka = ElectionRecordingKafkaSnap({"topics": topics_describe}, str(tmp_path))
+
+    result = kafka.elect_preferred_leaders("localhost:9092", command_config="client.properties")
+
+    # partitions whose preferred leader is out of sync are left alone
+    assert result["elected"] == [("orders", 1)]
+    assert result["invocations"] == 1
+    assert result["skew"][2]["imbalance"] == 1.0
+    base = ["--bootstrap-server=localhost:9092", "--command-config=client.properties"]
+    (describe, election) = kafka.calls
+    assert describe == ("topics", [*base, "--describe"], [], True)
+    path = election[1][-1].split("=", 1)[1]
+    assert election == (
+        "leader-election",
+        [*base, "--election-type=PREFERRED", f"--path-to-json-file={path}"],
+        [],
+        True,
+    )
+    assert os.path.dirname(path) == str(tmp_path)
+    assert not os.path.exists(path)
+    assert kafka.elections == [[{"topic": "orders", "partition": 1}]]
+
+
+def test_elect_preferred_leaders_batches_skewed_brokers_only(tmp_path):
+    # broker 0 leads none of its 5 partitions, broker 2 leads 9 of its 10
+    partitions = [
+        {"topic": "a", "partition": index, "leader": 1, "replicas": [0, 1], "isr": [0, 1]}
+        for index in range(5)
+    ]
+    partitions += [
+        {"topic": "b", "partition": index, "leader": 2, "replicas": [2, 1], "isr": [2, 1]}
+        for index in range(9)
+    ]
+    partitions.append(
+        {"topic": "b", "partition": 9, "leader": 1, "replicas": [2, 1], "isr": [2, 1]}
+    )
+    kafka = ElectionRecordingKafkaSnap({}, str(tmp_path))
+
+    result = kafka.elect_preferred_leaders(
+        "localhost:9092", threshold=0.2, batch_size=2, partitions=partitions
+    )
+
+    assert result["elected"] == [("a", index) for index in range(5)]
+    assert result["invocations"] == 3
+    # the partitions were given, so nothing is described
+    assert [call[0] for call in kafka.calls] == ["leader-election"] * 3
+    assert [len(batch) for batch in kafka.elections] == [2, 2, 1]
+    assert os.listdir(tmp_path) == []
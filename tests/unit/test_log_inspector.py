@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import os
+import struct
+from typing import List, Tuple
+
+import pytest
+from charms.kafka.v0.log_inspector import (
+    BATCH_HEADER,
+    LOG_OVERHEAD,
+    OFFSET_INDEX_ENTRY,
+    TIME_INDEX_ENTRY,
+    inspect_segment,
+    iter_partitions,
+    summarize_log_dirs,
+)
+
+# Kafka preallocates index files and fills the unused tail with zeros
+PREALLOCATED_ENTRIES = 64
+RECORDS_BYTES = 100
+
+
+def write_segment(
+    directory: str,
+    base_offset: int,
+    batches: List[Tuple[int, int, int]],
+    index_every: int = 2,
+) -> str:
+    """Writes a segment with its `.index` and `.timeindex`, as a broker would.
+
+    Args:
+        directory: the partition directory
+        base_offset: the first offset of the segment
+        batches: (record count, base timestamp, max timestamp) of each record batch
+        index_every: index every this many batches, starting with the second one
+
+    Returns:
+        The path to the `.log` file
+    """
+    stem = os.path.join(directory, f"{base_offset:020d}")
+    log, index, time_index = b"", b"", b""
+    offset = base_offset
+    for number, (records, base_timestamp, max_timestamp) in enumerate(batches):
+        position = len(log)
+        batch_length = BATCH_HEADER.size - LOG_OVERHEAD + RECORDS_BYTES
+        log += BATCH_HEADER.pack(
+            offset, batch_length, 0, 2, 0, 0, records - 1, base_timestamp, max_timestamp
+        )
+        log += b"\x01" * RECORDS_BYTES
+        last_relative = offset + records - 1 - base_offset
+        if number and number % index_every == 0:
+            index += OFFSET_INDEX_ENTRY.pack(last_relative, position)
+            time_index += TIME_INDEX_ENTRY.pack(max_timestamp, last_relative)
+        offset += records
+
+    with open(f"{stem}.log", "wb") as f:
+        f.write(log)
+    with open(f"{stem}.index", "wb") as f:
+        f.write(index.ljust(PREALLOCATED_ENTRIES * OFFSET_INDEX_ENTRY.size, b"\x00"))
+    with open(f"{stem}.timeindex", "wb") as f:
+        f.write(time_index.ljust(PREALLOCATED_ENTRIES * TIME_INDEX_ENTRY.size, b"\x00"))
+
+    return f"{stem}.log"
+
+
+def batches(count: int, records: int = 10, start: int = 1_700_000_000_000):
+    """Builds batches one second apart, with records spread over each second."""
+    return [(records, start + 1000 * i, start + 1000 * i + 999) for i in range(count)]
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    """A log dir with two segments of `orders-0`, one of `orders-1` and one of `audit-0`."""
+    for name in ("orders-0", "orders-1", "audit-0"):
+        (tmp_path / name).mkdir()
+
+    write_segment(str(tmp_path / "orders-0"), 0, batches(10))
+    write_segment(str(tmp_path / "orders-0"), 100, batches(5, start=1_700_000_010_000))
+    write_segment(str(tmp_path / "orders-1"), 0, batches(3))
+    write_segment(str(tmp_path / "audit-0"), 0, batches(1, records=1))
+    # not partitions: a replica being deleted and a stray file
+    (tmp_path / "orders-2.0123456789abcdef-delete").mkdir()
+    (tmp_path / "meta.properties").write_text("version=1\n")
+    return tmp_path
+
+
+def test_inspect_segment(tmp_path):
+    log_path = write_segment(str(tmp_path), 200, batches(9))
+
+    segment = inspect_segment(log_path)
+
+    assert segment["base_offset"] == 200
+    assert segment["size"] == 9 * (BATCH_HEADER.size + RECORDS_BYTES)
+    assert segment["index_entries"] == 4
+    assert segment["last_offset"] == 289
+    assert segment["oldest_timestamp"] == 1_700_000_000_000
+    assert segment["newest_timestamp"] == 1_700_000_008_999
+    assert segment["unhealthy_indexes"] == []
+
+
+def test_inspect_segment_without_index_entries(tmp_path):
+    log_path = write_segment(str(tmp_path), 0, batches(2), index_every=100)
+
+    segment = inspect_segment(log_path)
+
+    assert segment["index_entries"] == 0
+    assert segment["last_offset"] == 19
+    assert segment["newest_timestamp"] == 1_700_000_001_999
+
+
+def test_inspect_empty_segment(tmp_path):
+    log_path = write_segment(str(tmp_path), 500, [])
+
+    segment = inspect_segment(log_path)
+
+    assert segment["size"] == 0
+    assert segment["last_offset"] is None
+    assert segment["oldest_timestamp"] is None
+    assert segment["newest_timestamp"] is None
+
+
+def test_inspect_segment_with_out_of_order_index(tmp_path):
+    log_path = write_segment(str(tmp_path), 0, batches(9))
+    index_path = log_path.replace(".log", ".index")
+    with open(index_path, "r+b") as f:
+        # the second entry now points before the first
+        f.seek(OFFSET_INDEX_ENTRY.size)
+        f.write(OFFSET_INDEX_ENTRY.pack(1, 0))
+
+    segment = inspect_segment(log_path)
+
+    assert segment["unhealthy_indexes"] == [index_path]
+    # the whole segment is walked instead
+    assert segment["last_offset"] == 89
+
+
+def test_inspect_segment_with_truncated_time_index(tmp_path):
+    log_path = write_segment(str(tmp_path), 0, batches(5))
+    time_index_path = log_path.replace(".log", ".timeindex")
+    with open(time_index_path, "r+b") as f:
+        f.truncate(TIME_INDEX_ENTRY.size * 3 + 5)
+
+    segment = inspect_segment(log_path)
+
+    assert segment["unhealthy_indexes"] == [time_index_path]
+    assert segment["newest_timestamp"] == 1_700_000_004_999
+
+
+def test_inspect_segment_with_index_past_the_log(tmp_path):
+    log_path = write_segment(str(tmp_path), 0, batches(5))
+    index_path = log_path.replace(".log", ".index")
+    with open(index_path, "r+b") as f:
+        f.write(struct.pack(">ii", 30, os.path.getsize(log_path)))
+
+    assert inspect_segment(log_path)["unhealthy_indexes"] == [index_path]
+
+
+def test_iter_partitions(log_dir):
+    partitions = list(iter_partitions([str(log_dir), str(log_dir / "missing")]))
+
+    assert [(p["topic"], p["partition"]) for p in partitions] == [
+        ("audit", 0),
+        ("orders", 0),
+        ("orders", 1),
+    ]
+    orders = partitions[1]
+    assert orders["log_dir"] == str(log_dir)
+    assert orders["segments"] == 2
+    assert orders["log_start_offset"] == 0
+    assert orders["log_end_offset"] == 150
+    assert orders["oldest_timestamp"] == 1_700_000_000_000
+    assert orders["newest_timestamp"] == 1_700_000_014_999
+    assert orders["size"] == 15 * (BATCH_HEADER.size + RECORDS_BYTES)
+
+
+def test_summarize_log_dirs(log_dir):
+    topics = summarize_log_dirs([str(log_dir)])
+
+    assert sorted(topics) == ["audit", "orders"]
+    assert topics["orders"]["segments"] == 3
+    assert topics["orders"]["size"] == 18 * (BATCH_HEADER.size + RECORDS_BYTES)
+    assert sorted(topics["orders"]["partitions"]) == [0, 1]
+    assert topics["audit"]["oldest_timestamp"] == 1_700_000_000_000
+    assert topics["audit"]["newest_timestamp"] == 1_700_000_000_999
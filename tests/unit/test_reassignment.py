@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import random
+
+import pytest
+from charms.kafka.v0.reassignment import (
+    MIN_THROTTLE_RATE,
+    batch_reassignment,
+    plan_reassignment,
+)
+
+GIB = 1024**3
+
+
+@pytest.fixture
+def cluster():
+    """200 partitions of 3 replicas over brokers 0 to 5 in 3 racks, randomly sized."""
+    rng = random.Random(42)
+    brokers = {broker_id: {"rack": f"az{broker_id % 3}"} for broker_id in range(6)}
+    partitions, sizes = [], {}
+    for index in range(200):
+        first = index % 6
+        # one replica per rack, as Kafka's rack-aware assignment does
+        replicas = [first, (first + 1) % 6, (first + 2) % 6]
+        partitions.append({"topic": "orders", "partition": index, "replicas": replicas})
+        sizes[("orders", index)] = rng.randint(1, 100) * GIB
+    return partitions, sizes, brokers
+
+
+def _loads(partitions, sizes, moves):
+    assignments = {(p["topic"], p["partition"]): p["replicas"] for p in partitions}
+    for move in moves:
+        assignments[(move["topic"], move["partition"])] = move["replicas"]
+
+    load = {}
+    for key, replicas in assignments.items():
+        for replica in replicas:
+            load[replica] = load.get(replica, 0) + sizes.get(key, 0)
+    return assignments, load
+
+
+def test_plan_balanced_cluster_moves_nothing():
+    partitions = [
+        {"topic": "t", "partition": index, "replicas": [index % 3, (index + 1) % 3]}
+        for index in range(6)
+    ]
+    sizes = {("t", index): GIB for index in range(6)}
+
+    assert plan_reassignment(partitions, sizes, {0: {}, 1: {}, 2: {}}) == []
+
+
+def test_plan_moves_replicas_off_removed_brokers(cluster):
+    partitions, sizes, brokers = cluster
+    del brokers[5]
+
+    moves = plan_reassignment(partitions, sizes, brokers)
+
+    assignments, load = _loads(partitions, sizes, moves)
+    assert all(5 not in replicas for replicas in assignments.values())
+    assert all(len(set(replicas)) == 3 for replicas in assignments.values())
+    for move in moves:
+        # the replicas that stay keep their position, so preferred leaders only move with them
+        for previous, replica in zip(move["previous_replicas"], move["replicas"]):
+            assert previous == replica or previous not in move["replicas"]
+
+
+def test_plan_fills_new_broker(cluster):
+    partitions, sizes, brokers = cluster
+    # one new broker per rack, as every partition has a replica in each rack
+    for broker_id in (6, 7, 8):
+        brokers[broker_id] = {"rack": f"az{broker_id % 3}"}
+    tolerance = 0.05
+
+    moves = plan_reassignment(partitions, sizes, brokers, tolerance=tolerance)
+
+    _, load = _loads(partitions, sizes, moves)
+    fair = sum(load.values()) / len(brokers)
+    assert moves
+    assert all(load[broker_id] > 0 for broker_id in (6, 7, 8))
+    assert max(load.values()) <= fair * (1 + tolerance)
+
+
+def test_plan_weighs_brokers_by_capacity():
+    partitions = [{"topic": "t", "partition": index, "replicas": [0]} for index in range(30)]
+    sizes = {("t", index): GIB for index in range(30)}
+    brokers = {0: {}, 1: {"capacity": 2}}
+
+    moves = plan_reassignment(partitions, sizes, brokers, tolerance=0.0)
+
+    _, load = _loads(partitions, sizes, moves)
+    assert load == {0: 10 * GIB, 1: 20 * GIB}
+
+
+def test_plan_prefers_racks_the_partition_is_not_in():
+    partitions = [
+        {"topic": "t", "partition": 0, "replicas": [0, 3]},
+        {"topic": "t", "partition": 1, "replicas": [2]},
+    ]
+    sizes = {("t", 0): GIB, ("t", 1): GIB}
+    brokers = {0: {"rack": "a"}, 1: {"rack": "a"}, 2: {"rack": "b"}}
+
+    moves = plan_reassignment(partitions, sizes, brokers, tolerance=1.0)
+
+    # broker 1 is the least loaded, but in the same rack as broker 0
+    assert moves == [
+        {"topic": "t", "partition": 0, "replicas": [0, 2], "previous_replicas": [0, 3]}
+    ]
+
+
+def test_plan_rebalancing_keeps_rack_spread():
+    rng = random.Random(7)
+    brokers = {broker_id: {"rack": f"az{broker_id % 3}"} for broker_id in range(12)}
+    partitions, sizes = [], {}
+    for index in range(3000):
+        # skewed towards the first brokers, some partitions in fewer racks than they could be
+        candidates = range(12) if index % 2 else range(6)
+        replicas = rng.sample(candidates, 3)
+        partitions.append({"topic": "t", "partition": index, "replicas": replicas})
+        sizes[("t", index)] = rng.randint(1, 1000)
+
+    moves = plan_reassignment(partitions, sizes, brokers)
+
+    def spread(replicas):
+        return len({brokers[replica]["rack"] for replica in replicas})
+
+    assert moves
+    assert all(spread(m["replicas"]) >= spread(m["previous_replicas"]) for m in moves)
+
+
+def test_plan_skips_optional_moves_into_used_racks():
+    partitions = [{"topic": "t", "partition": index, "replicas": [0, 1]} for index in range(10)]
+    sizes = {("t", index): GIB for index in range(10)}
+    # broker 2 is the only one with room, in the rack broker 1 is in
+    brokers = {0: {"rack": "a"}, 1: {"rack": "b"}, 2: {"rack": "b"}}
+
+    moves = plan_reassignment(partitions, sizes, brokers)
+
+    # so only broker 1 can hand replicas over to it
+    assert moves
+    assert all(move["replicas"] == [0, 2] for move in moves)
+
+
+def test_plan_rejects_too_few_brokers():
+    partitions = [{"topic": "t", "partition": 0, "replicas": [0, 1, 2]}]
+
+    with pytest.raises(ValueError):
+        plan_reassignment(partitions, {}, {0: {}, 1: {}})
+
+
+def test_batch_reassignment_bounds_batches():
+    moves = [
+        {"topic": "t", "partition": index, "replicas": [1, 2], "previous_replicas": [0, 2]}
+        for index in range(10)
+    ]
+    sizes = {("t", index): 10 * GIB for index in range(10)}
+
+    batches = batch_reassignment(moves, sizes, max_batch_bytes=35 * GIB, max_batch_partitions=2)
+
+    assert [len(batch["reassignment"]["partitions"]) for batch in batches] == [2, 2, 2, 2, 2]
+    assert all(batch["bytes"] == 20 * GIB for batch in batches)
+
+    batches = batch_reassignment(moves, sizes, max_batch_bytes=35 * GIB)
+
+    assert [len(batch["reassignment"]["partitions"]) for batch in batches] == [3, 3, 3, 1]
+    assert batches[0]["reassignment"]["version"] == 1
+    assert batches[0]["reassignment"]["partitions"][0] == {
+        "topic": "t",
+        "partition": 0,
+        "replicas": [1, 2],
+    }
+
+
+def test_batch_reassignment_throttle():
+    moves = [
+        {"topic": "t", "partition": index, "replicas": [1, 2], "previous_replicas": [0, 2]}
+        for index in range(4)
+    ]
+    sizes = {("t", index): 90 * GIB for index in range(4)}
+
+    (batch,) = batch_reassignment(moves, sizes, max_batch_bytes=1000 * GIB, target_seconds=3600)
+
+    # broker 0 sends, and broker 1 receives, all 360GiB
+    assert batch["throttle"] == -(-360 * GIB // 3600)
+
+    (batch,) = batch_reassignment(
+        moves, sizes, max_batch_bytes=1000 * GIB, max_throttle_rate=MIN_THROTTLE_RATE * 2
+    )
+    assert batch["throttle"] == MIN_THROTTLE_RATE * 2
+
+    (batch,) = batch_reassignment(moves, {}, target_seconds=3600)
+    assert batch["throttle"] == MIN_THROTTLE_RATE
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import itertools
+import json
+import os
+import pathlib
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from charms.operator_libs_linux.v1 import snap
+
+
+def test_add_installs_absent_snaps_in_one_change(snap_lib_snapd):
+    installed = snap.add(["jq", "yq"])
+
+    assert [s.name for s in installed] == ["jq", "yq"]
+    assert all(s.present for s in installed)
+    posts = [path for method, path in snap_lib_snapd.requests if method == "POST"]
+    assert posts == ["/v2/snaps"]
+
+
+def test_remove_removes_snaps_in_one_change(snap_lib_snapd):
+    removed = snap.remove(["kafka", "lxd"])
+
+    assert not any(s.present for s in removed)
+    posts = [path for method, path in snap_lib_snapd.requests if method == "POST"]
+    assert posts == ["/v2/snaps"]
+
+
+def test_add_survives_snapd_failing_to_reload_installed_snaps(snap_lib_snapd, monkeypatch):
+    handle = snap_lib_snapd.handle
+
+    def failing_reloads(method, path, query, body):
+        if method == "GET" and path in ("/v2/snaps/jq", "/v2/snaps/yq"):
+            return snap_lib_snapd._error(500, "internal error")
+        return handle(method, path, query, body)
+
+    monkeypatch.setattr(snap_lib_snapd, "handle", failing_reloads)
+
+    installed = snap.add(["jq", "yq"])
+
+    # the snaps are installed, they just keep the details they had before
+    assert [s.name for s in installed] == ["jq", "yq"]
+    assert all(s.present for s in installed)
+
+
+@pytest.fixture
+def events():
+    """The instrumentation events recorded while the test runs."""
+    recorded = []
+    snap.add_instrumentation_hook(recorded.append)
+    yield recorded
+    snap.remove_instrumentation_hook(recorded.append)
+
+
+@pytest.mark.parametrize("opener", [False, True])
+def test_request_events_have_no_status_when_snapd_is_unreachable(tmp_path, events, opener):
+    socket_path = str(tmp_path / "snapd.socket")
+    client = snap.SnapClient(
+        socket_path=socket_path,
+        opener=snap.SnapClient._get_default_opener(socket_path) if opener else None,
+    )
+
+    with pytest.raises(snap.SnapAPIError) as e:
+        client.get_installed_snaps()
+
+    assert e.value.code == 500
+    assert [(event["target"], event["status"]) for event in events] == [("GET snaps", None)]
+
+
+def test_request_events_record_error_statuses(snap_lib_snapd, events):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+
+    with pytest.raises(snap.SnapAPIError):
+        client.get_installed_snap_information("missing")
+
+    assert [(event["target"], event["status"]) for event in events] == [("GET snaps/missing", 404)]
+
+
+def test_sideload_outlasts_the_request_timeout(snap_lib_snapd, tmp_path):
+    snap_file = tmp_path / "hello_1.snap"
+    snap_file.write_bytes(b"\0" * 4096)
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path, timeout=0.1)
+    # snapd takes longer to answer than the client waits for ordinary requests
+    snap_lib_snapd.latency = 0.3
+
+    with pytest.raises(snap.SnapAPIError):
+        client.get_installed_snaps()
+    change_id = client.sideload(str(snap_file), dangerous=True)
+
+    assert change_id
+
+
+def test_client_reconnects_when_snapd_drops_the_connection(snap_lib_snapd):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    snap_lib_snapd.drop_connections = True
+
+    client.get_installed_snaps()
+    dropped = client._connection().sock
+    assert client.get_installed_snaps()
+
+    assert client._connection().sock is not dropped
+    assert snap_lib_snapd.requests == [("GET", "/v2/snaps"), ("GET", "/v2/snaps")]
+
+
+def test_client_keeps_a_connection_per_thread(snap_lib_snapd):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    client.get_installed_snaps()
+    connections = []
+
+    def other_thread():
+        client.get_installed_snaps()
+        connections.append(client._connection())
+        client.close()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+
+    assert connections[0] is not client._connection()
+    # closing the other thread's connection left this one's open
+    assert connections[0].sock is None
+    assert client._connection().sock is not None
+
+
+def test_cached_snaps_share_the_cache_client(snap_lib_snapd):
+    cache = snap.SnapCache()
+
+    assert cache["kafka"]._snap_client is cache._snap_client
+    assert cache["jq"]._snap_client is cache._snap_client
+    assert cache.refresh("lxd")._snap_client is cache._snap_client
+
+
+def _change_polls(snapd, change_id):
+    return snapd.requests.count(("GET", "/v2/changes/{}".format(change_id)))
+
+
+def test_wait_for_changes_polls_only_pending_changes(snap_lib_snapd):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    quick, slow = client.snaps_action("refresh", ["kafka"]), client.snaps_action("hold", ["lxd"])
+    snap_lib_snapd.finish_change(slow, polls=2)
+
+    changes = client.wait_for_changes([quick, slow], max_delay=0.01)
+
+    assert {change_id: change["status"] for change_id, change in changes.items()} == {
+        quick: "Done",
+        slow: "Done",
+    }
+    assert (_change_polls(snap_lib_snapd, quick), _change_polls(snap_lib_snapd, slow)) == (1, 3)
+
+
+def test_wait_for_changes_waits_for_all_before_reporting_failures(snap_lib_snapd):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    failing, slow = client.snaps_action("refresh", ["kafka"]), client.snaps_action("hold", ["lxd"])
+    snap_lib_snapd.finish_change(failing, status="Error", err="cannot refresh kafka")
+    snap_lib_snapd.finish_change(slow, polls=2)
+
+    with pytest.raises(snap.SnapError) as e:
+        client.wait_for_changes([failing, slow], max_delay=0.01)
+
+    assert "{} finished with status Error: cannot refresh kafka".format(failing) in e.value.message
+    assert "{} finished".format(slow) not in e.value.message
+    assert _change_polls(snap_lib_snapd, slow) == 3
+
+
+def test_wait_for_changes_times_out_on_changes_still_in_progress(snap_lib_snapd):
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    quick, stuck = client.snaps_action("refresh", ["kafka"]), client.snaps_action("hold", ["lxd"])
+    snap_lib_snapd.finish_change(stuck, polls=10**6)
+
+    with pytest.raises(snap.SnapError) as e:
+        client.wait_for_changes([quick, stuck], timeout=0.2, max_delay=0.01)
+
+    assert e.value.message == "Timed out waiting for change(s) {}".format(stuck)
+    assert _change_polls(snap_lib_snapd, quick) == 1
+
+
+def _batches_end_with(snapd, monkeypatch, **finish):
+    """Makes every batched change snapd accepts end as `FakeSnapd.finish_change` is told."""
+    handle = snapd.handle
+
+    def finishing_batches(method, path, query, body):
+        status, document = handle(method, path, query, body)
+        if (method, path) == ("POST", "/v2/snaps"):
+            snapd.finish_change(document["change"], **finish)
+        return status, document
+
+    monkeypatch.setattr(snapd, "handle", finishing_batches)
+
+
+@pytest.fixture
+def ensured(monkeypatch):
+    """The names of the snaps ensured one at a time while the test runs."""
+    names = []
+    monkeypatch.setattr(snap.Snap, "ensure", lambda self, state, **kwargs: names.append(self.name))
+    return names
+
+
+def test_add_waits_for_a_batch_however_long_it_takes(snap_lib_snapd, monkeypatch, ensured):
+    _batches_end_with(snap_lib_snapd, monkeypatch, polls=3)
+    # every reading of the clock is past any timeout
+    clock = itertools.count(step=3600.0)
+    monkeypatch.setattr(
+        snap, "time", SimpleNamespace(monotonic=lambda: next(clock), sleep=time.sleep)
+    )
+
+    installed = snap.add(["jq", "yq"])
+
+    assert all(s.present for s in installed)
+    assert ensured == []
+
+
+def test_add_retries_one_at_a_time_once_a_batch_failed(snap_lib_snapd, monkeypatch, ensured):
+    _batches_end_with(snap_lib_snapd, monkeypatch, status="Error", err="cannot install")
+
+    snap.add(["jq", "yq"])
+
+    assert ensured == ["jq", "yq"]
+
+
+def test_add_fails_when_a_batch_cannot_be_followed(snap_lib_snapd, monkeypatch, ensured):
+    handle = snap_lib_snapd.handle
+
+    def unpollable_batches(method, path, query, body):
+        status, document = handle(method, path, query, body)
+        if (method, path) == ("POST", "/v2/snaps"):
+            snap_lib_snapd.errors[("GET", "/v2/changes/{}".format(document["change"]))] = 500
+        return status, document
+
+    monkeypatch.setattr(snap_lib_snapd, "handle", unpollable_batches)
+
+    with pytest.raises(snap.SnapError, match="Unable to tell how batched install of jq, yq went"):
+        snap.add(["jq", "yq"])
+    # the batch may still be running, so the snaps are left to it
+    assert ensured == []
+
+
+def test_cache_reads_the_catalog_on_the_first_miss_only(snap_lib_snapd):
+    names = pathlib.Path(snap.SNAPD_NAMES_PATH)
+    names.unlink()
+
+    cache = snap.SnapCache()
+    assert cache["kafka"].present
+    assert "lxd" in cache
+
+    names.write_text("kafka\njq\n")
+    assert "jq" in cache
+    names.write_text("kafka\njq\nyq\n")
+    assert "yq" not in cache
+
+
+def _snaps_requests(snapd):
+    return snapd.requests.count(("GET", "/v2/snaps"))
+
+
+def test_persisted_cache_is_loaded_while_snapd_state_is_unchanged(snap_lib_snapd, tmp_path):
+    persist_path = str(tmp_path / "snap-cache.json")
+    built = snap.SnapCache(persist_path=persist_path)
+
+    loaded = snap.SnapCache(persist_path=persist_path)
+
+    assert _snaps_requests(snap_lib_snapd) == 1
+    assert [(s.name, s.revision, s.channel) for s in loaded._snap_map.values()] == [
+        (s.name, s.revision, s.channel) for s in built._snap_map.values()
+    ]
+    assert loaded["kafka"]._apps == built["kafka"]._apps != []
+
+
+def test_persisted_cache_is_invalidated_when_snapd_saves_its_state(snap_lib_snapd, tmp_path):
+    persist_path = str(tmp_path / "snap-cache.json")
+    snap.SnapCache(persist_path=persist_path)
+    snap_lib_snapd.installed.pop("lxd")
+    stat = os.stat(snap.SNAPD_STATE_PATH)
+    os.utime(snap.SNAPD_STATE_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache = snap.SnapCache(persist_path=persist_path)
+
+    assert _snaps_requests(snap_lib_snapd) == 2
+    assert "lxd" not in cache._snap_map
+    # and what snapd said this time is saved in turn
+    snap.SnapCache(persist_path=persist_path)
+    assert _snaps_requests(snap_lib_snapd) == 2
+
+
+def test_corrupt_persisted_cache_is_rebuilt_from_snapd(snap_lib_snapd, tmp_path):
+    persist_path = tmp_path / "snap-cache.json"
+    persist_path.write_text('{"version": 1, "key": [')
+
+    cache = snap.SnapCache(persist_path=str(persist_path))
+
+    assert _snaps_requests(snap_lib_snapd) == 1
+    assert cache["kafka"].present
+    assert json.loads(persist_path.read_text())["version"] == snap.PERSISTED_CACHE_VERSION
+
+
+def _conf_requests(snapd, name):
+    return snapd.requests.count(("GET", "/v2/snaps/{}/conf".format(name)))
+
+
+def test_get_many_asks_snapd_for_keys_not_read_before(snap_lib_snapd):
+    kafka = snap.SnapCache()["kafka"]
+    snap_lib_snapd.config["kafka"]["retention"] = 7
+
+    assert kafka.get_many(["log-level"]) == {"log-level": "INFO"}
+    assert kafka.get_many(["log-level", "retention"]) == {"log-level": "INFO", "retention": 7}
+    assert kafka.get_many(["retention", "log-level"]) == {"retention": 7, "log-level": "INFO"}
+
+    assert _conf_requests(snap_lib_snapd, "kafka") == 2
+    assert snap_lib_snapd.requests[-1] == ("GET", "/v2/snaps/kafka/conf")
+
+
+def test_set_many_invalidates_cached_config(snap_lib_snapd):
+    kafka = snap.SnapCache()["kafka"]
+    kafka.get_many(["log-level"])
+
+    kafka.set_many({"log-level": "DEBUG", "retention": 7})
+
+    assert snap_lib_snapd.config["kafka"] == {"log-level": "DEBUG", "retention": 7}
+    assert kafka.get_many(["log-level"]) == {"log-level": "DEBUG"}
+    assert _conf_requests(snap_lib_snapd, "kafka") == 2
+
+
+def test_refresh_invalidates_cached_config(snap_lib_snapd):
+    cache = snap.SnapCache()
+    kafka = cache["kafka"]
+    kafka.get_many(["log-level"])
+    # e.g. changed by the snap's configure hook during a refresh
+    snap_lib_snapd.config["kafka"]["log-level"] = "WARN"
+
+    assert cache.refresh("kafka") is kafka
+    assert kafka.get_many(["log-level"]) == {"log-level": "WARN"}
+
+
+@pytest.mark.parametrize("exit_code", [0, 1])
+def test_hold_refresh_events(tmp_path, monkeypatch, events, exit_code):
+    snap_bin = tmp_path / "snap"
+    snap_bin.write_text("#!/bin/sh\nexit {}\n".format(exit_code))
+    snap_bin.chmod(0o755)
+    monkeypatch.setenv("PATH", "{}:{}".format(tmp_path, os.environ["PATH"]))
+
+    if exit_code:
+        with pytest.raises(snap.SnapError):
+            snap.hold_refresh(0)
+    else:
+        snap.hold_refresh(0)
+
+    assert [(e["kind"], e["target"], e["status"]) for e in events] == [
+        ("subprocess", "snap set", exit_code)
+    ]
+
+
+def test_invalidate_services_asks_snapd_again(snap_lib_snapd):
+    kafka = snap.SnapCache()["kafka"]
+    client = snap.SnapClient(socket_path=snap_lib_snapd.socket_path)
+    assert kafka.services["daemon"]["active"]
+
+    client.wait_for_change(client.service_action("stop", ["kafka.daemon"]))
+    assert kafka.services["daemon"]["active"]
+
+    kafka.invalidate_services()
+    assert not kafka.services["daemon"]["active"]